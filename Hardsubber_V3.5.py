@@ -11,11 +11,16 @@ import shlex
 import difflib
 import threading
 import subprocess
+from collections import deque
+from dataclasses import dataclass
 
 # ---SUPPORTED FORMATS--- #
 video_exts = [".mp4", ".mkv", ".mov"]
 subtitle_exts = [".srt", ".vtt"]
 
+# ---PROGRESS BAR REFRESH (seconds)--- #
+PROGRESS_INTERVAL = 0.5
+
 # ---WARNINGS--- #
 print(
     " (@.@) WARNING: This script will hard-sub videos using FFmpeg.\n"
@@ -58,6 +63,8 @@ print(f"\nScanning: {folder}\n")
 subtitle_files = [
     f for f in os.listdir(folder) if os.path.splitext(f)[1].lower() in subtitle_exts
 ]
+# --[Lowercase lookup, built once for every video]-- #
+lowercase_subs = {sub.lower(): sub for sub in subtitle_files}
 
 
 # ---BREAK-PROOF FILE NAME--- #
@@ -71,10 +78,49 @@ def get_file_size_mb(path):
     except:
         return 0.0
 
+# ---FFMPEG PROGRESS READER--- #
+@dataclass
+class FFmpegProgress:
+    out_time: float = 0.0   # seconds of output written
+    total_size: int = 0     # bytes written to the output so far
+    fps: float = 0.0
+    speed: float = 0.0      # multiple of realtime
+    finished: bool = False
+
+
+def read_ffmpeg_progress(stream):
+    values = {}
+    for line in stream:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        if key != "progress":
+            values[key] = value
+            continue
+
+        event = FFmpegProgress(finished=(value == "end"))
+        try:
+            event.out_time = int(values.get("out_time_us", values.get("out_time_ms", "0"))) / 1_000_000
+        except ValueError:
+            pass
+        try:
+            event.total_size = int(values.get("total_size", "0"))
+        except ValueError:
+            pass
+        try:
+            event.fps = float(values.get("fps", "0"))
+        except ValueError:
+            pass
+        try:
+            event.speed = float(values.get("speed", "0x").rstrip("x"))
+        except ValueError:
+            pass
+        values = {}
+        yield event
+
 # ---LOOSE MATCH SUBTITLES--- #
 def find_loose_subtitle(video_name):
     video_name = video_name.lower()
-    lowercase_subs = {sub.lower(): sub for sub in subtitle_files}
     matches = difflib.get_close_matches(
         video_name, lowercase_subs.keys(), n=1, cutoff=0.3
     )
@@ -157,6 +203,8 @@ for file in video_files:
 
                 cmd = [
                     "ffmpeg",
+                    "-hide_banner", "-loglevel", "error",
+                    "-nostats", "-progress", "pipe:1",
                     "-y",
                     "-i", video_path,
                     "-vf", f"subtitles='{subtitle_filter_path}'",
@@ -192,24 +240,30 @@ for file in video_files:
                 try:
                     process = subprocess.Popen(
                         cmd,
+                        stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
-                        stdout=subprocess.DEVNULL,
-                        universal_newlines=True,
-                        bufsize=0
+                        text=True,
+                        encoding="utf-8",
+                        errors="replace"
                     )
+                    # --[Keep stderr for errors only]-- #
+                    errors = deque(maxlen=20)
+                    stderr_reader = threading.Thread(target=errors.extend, args=(process.stderr,), daemon=True)
+                    stderr_reader.start()
 
-                    for line in process.stderr:
-                        if "time=" in line:
-                            match = re.search(r"time=(\d+):(\d+):(\d+.\d)", line)
-                            if match:
-                                h, m, s = map(float, match.groups())
-                                s = round(s, 1)
-                                current_sec = h * 3600 + m * 60 + s
-                                percent = (current_sec / total_duration) * 100
-                                output_size = get_file_size_mb(output_path)
-                                size_percent = (output_size / input_total_size) * 100 if input_total_size > 0 else 0
-                                draw_bar(percent, video, sub, out_file, start_time, output_size, size_percent)
+                    # --[Redraw on a fixed clock, sizes straight from ffmpeg]-- #
+                    last_draw = 0.0
+                    for event in read_ffmpeg_progress(process.stdout):
+                        now = time.time()
+                        if now - last_draw < PROGRESS_INTERVAL and not event.finished:
+                            continue
+                        last_draw = now
+                        percent = (event.out_time / total_duration) * 100
+                        output_size = event.total_size / (1024 * 1024)
+                        size_percent = (output_size / input_total_size) * 100 if input_total_size > 0 else 0
+                        draw_bar(percent, video, sub, out_file, start_time, output_size, size_percent)
                     process.wait()
+                    stderr_reader.join(timeout=5)
                     if process.returncode == 0:
                         final_output_size = get_file_size_mb(output_path)
                         print(f"\n Output size: {final_output_size:.2f} MB")
@@ -222,6 +276,8 @@ for file in video_files:
                         print(f"\n{out_file} Done (^,^)\n")
                     else:
                         print(f"\n FFmpeg failed for: {video}\n")
+                        if errors:
+                            print("".join(errors))
                 except Exception as e:
                     print(f"\n Error running ffmpeg: {e}\n")
 
@@ -8,601 +8,518 @@
 
 import sys
 import os
-import re
 import time
 import json
-import difflib
+import sqlite3
 import threading
 import subprocess
 import webbrowser
-import qtawesome as qta
 from pathlib import Path
+
+# Set HARDSUBBER_STARTUP_TRACE=1 to print how long each startup phase takes
+STARTUP_TRACE = bool(os.environ.get("HARDSUBBER_STARTUP_TRACE"))
+STARTUP_T0 = time.perf_counter()
+
+
+def trace_startup(label):
+    if STARTUP_TRACE:
+        print(f"[startup] {(time.perf_counter() - STARTUP_T0) * 1000:8.1f} ms  {label}", file=sys.stderr)
+
+
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QGridLayout, QLabel, QPushButton, QComboBox, QProgressBar,
     QFileDialog, QScrollArea, QFrame, QTextEdit, QGroupBox,
-    QMessageBox, QSplitter, QTableWidget, QTableWidgetItem,
+    QMessageBox, QSplitter, QTableView, QStyledItemDelegate,
+    QStyleOptionViewItem, QStyleOptionButton, QStyle,
     QHeaderView, QCheckBox, QSpinBox, QLineEdit, QSlider,
     QStatusBar, QMenuBar, QMenu, QDialog, QFormLayout, QTabWidget,
     QColorDialog, QFontDialog, QRadioButton, QButtonGroup
 )
-from PyQt6.QtMultimediaWidgets import QVideoWidget
-from PyQt6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize, QSettings, QMimeData, QUrl, QPoint
-from PyQt6.QtGui import QFont, QPixmap, QIcon, QPalette, QColor, QAction, QStandardItem, QDrag, QPainter
+from PyQt6.QtCore import (
+    Qt, QThread, pyqtSignal, QTimer, QSize, QSettings, QMimeData, QPoint, QRect,
+    QEvent, QAbstractTableModel, QModelIndex
+)
+from PyQt6.QtGui import QPixmap, QIcon, QPalette, QColor, QAction, QStandardItem, QDrag
+from hardsubber_engine import SubtitleMatcher, JobJournal, OutputCache, EncodeEngine, probe_ffmpeg
 
-# --- integrated video+subtitle widget ---
-class SubtitleVideoWidget(QVideoWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.subtitle_text = "Sample subtitle text to preview your styling changes"
-        self.font_size = 16
-        self.font_color = "#FFFFFF"
-        self.font_name = "Arial"
-        self.border_style = 3
-        self.setMinimumSize(640, 360)
-        self.setStyleSheet("background-color: #000000;")
-
-    def setSubtitle(self, text):
-        self.subtitle_text = text
-        self.update()
-
-    def updateSubtitleStyle(self, font_size=16, font_color="#FFFFFF", font_name="Arial", border_style=3):
-        self.font_size = font_size
-        self.font_color = font_color
-        self.font_name = font_name
-        self.border_style = border_style
-        self.update()
-
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        # Set up font
-        font = QFont(self.font_name, self.font_size, QFont.Weight.Bold)
-        painter.setFont(font)
-        
-        # Calculate text position (bottom center with margin)
-        margin = 20
-        widget_rect = self.rect()
-        
-        # Get text metrics
-        font_metrics = painter.fontMetrics()
-        text_width = font_metrics.horizontalAdvance(self.subtitle_text)
-        text_height = font_metrics.height()
-        
-        # Position text at bottom center
-        text_x = (widget_rect.width() - text_width) // 2
-        text_y = widget_rect.height() - margin - text_height // 2
-        
-        text_rect = QRect(text_x, text_y - text_height, text_width, text_height)
-        
-        # Apply border style
-        if self.border_style == 3:  # Box background
-            # Draw background box
-            box_rect = text_rect.adjusted(-10, -5, 10, 5)
-            painter.fillRect(box_rect, QColor(0, 0, 0, 180))
-        
-        # Draw text with outline if needed
-        if self.border_style in [1, 4]:  # Outline or Outline + Drop shadow
-            # Draw outline
-            outline_color = QColor(0, 0, 0)
-            for dx in [-2, -1, 0, 1, 2]:
-                for dy in [-2, -1, 0, 1, 2]:
-                    if dx == 0 and dy == 0:
-                        continue
-                    painter.setPen(outline_color)
-                    painter.drawText(text_rect.translated(dx, dy), Qt.AlignmentFlag.AlignCenter, self.subtitle_text)
-        
-        # Draw drop shadow if needed (before main text)
-        if self.border_style in [2, 4]:  # Drop shadow or Outline + Drop shadow
-            painter.setPen(QColor(0, 0, 0, 150))
-            painter.drawText(text_rect.translated(2, 2), Qt.AlignmentFlag.AlignCenter, self.subtitle_text)
-        
-        # Draw main text
-        painter.setPen(QColor(self.font_color))
-        painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, self.subtitle_text)
+trace_startup("imports done")
 
 # ---VIDEO PROCESSOR THREAD CLASS--- #
 class VideoProcessor(QThread):
-    progress_updated = pyqtSignal(int, str, float, float, float, float)
-    video_completed = pyqtSignal(str, bool, str)
+    """Runs an EncodeEngine batch off the GUI thread and relays its callbacks as signals"""
+    progress_snapshot = pyqtSignal(dict)
+    video_completed = pyqtSignal(str, str, bool, str)
     all_completed = pyqtSignal(int, int)
     error_occurred = pyqtSignal(str, str)
     skip_current = pyqtSignal()
 
-    def __init__(self, video_pairs, output_folder, speed_preset, subtitle_settings):
+    def __init__(self, video_pairs, output_folder, speed_preset, subtitle_settings, max_workers=1, journal=None,
+                 output_cache=None, pinned=()):
         super().__init__()
-        self.video_pairs = video_pairs
-        self.output_folder = output_folder
-        self.speed_preset = speed_preset
-        self.subtitle_settings = subtitle_settings
-        self.is_running = True
-        self.skip_requested = False
-        self.start_time = None
-        self.processed_count = 0
-        self.cancelled = False
+        self.engine = EncodeEngine(
+            video_pairs, output_folder, speed_preset, subtitle_settings, max_workers=max_workers,
+            journal=journal, output_cache=output_cache, pinned=pinned,
+            on_progress=self.progress_snapshot.emit,
+            on_video_completed=self.video_completed.emit,
+            on_error=self.error_occurred.emit
+        )
 
     def stop(self):
-        self.is_running = False
-        self.cancelled = True
-
-    def skip(self):
-        self.skip_requested = True
+        self.engine.stop()
 
-    def get_file_size_mb(self, path):
-        try:
-            return os.path.getsize(path) / (1024 * 1024)
-        except:
-            return 0.0
+    def skip(self, job_id=None):
+        self.engine.skip(job_id)
 
-    def get_duration(self, video_path):
-        try:
-            result = subprocess.run(
-                ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-                 "-of", "default=noprint_wrappers=1:nokey=1", video_path],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30
-            )
-            return float(result.stdout.strip())
-        except:
-            return None
+    def run(self):
+        success_count, total_videos = self.engine.run()
+        if not self.engine.cancelled:
+            self.all_completed.emit(success_count, total_videos)
 
-    def break_proof_filename(self, name):
-        return re.sub(r'[<>:"/\\|?*]', "_", name)
+# ---FOLDER SCANNER THREAD CLASS--- #
+class FolderScanner(QThread):
+    pairs_found = pyqtSignal(list)
+    subtitles_resolved = pyqtSignal(dict)
+    scan_finished = pyqtSignal(int, bool)
+    scan_error = pyqtSignal(str)
 
-    def calculate_eta(self, current_progress, total_videos):
-        if not self.start_time or current_progress == 0:
-            return 0.0
+    VIDEO_EXTS = {".mp4", ".mkv", ".mov", ".avi", ".wmv", ".flv", ".webm"}
+    SUBTITLE_EXTS = {".srt", ".vtt", ".ass", ".ssa"}
 
-        elapsed = time.time() - self.start_time
-        videos_completed = self.processed_count + (current_progress / 100)
-        if videos_completed == 0:
-            return 0.0
+    def __init__(self, paths, recursive=True, batch_size=200, batch_interval=0.25):
+        super().__init__()
+        self.paths = paths
+        self.recursive = recursive
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.is_running = True
 
-        time_per_video = elapsed / videos_completed
-        remaining_videos = total_videos - videos_completed
-        return remaining_videos * time_per_video
+    def stop(self):
+        self.is_running = False
 
     def run(self):
-        self.start_time = time.time()
-        success_count = 0
-        total_videos = len(self.video_pairs)
-
-        for i, (video_path, subtitle_path) in enumerate(self.video_pairs):
-            if not self.is_running or self.cancelled:
-                break
-
-            self.skip_requested = False
-            video_name = os.path.basename(video_path)
-            name, ext = os.path.splitext(video_name)
-            safe_name = self.break_proof_filename(name)
-
-            if self.output_folder:
-                output_path = os.path.join(self.output_folder, f"{safe_name}_subbed.mp4")
+        self.batch = []
+        self.last_flush = time.time()
+        self.video_count = 0
+        leftover_videos = []
+        leftover_subs = []
+
+        # Dropped files are matched together as if they shared a folder
+        loose_videos, loose_subs = [], []
+        folders = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                folders.append(path)
             else:
-                output_path = os.path.join(os.path.dirname(video_path), f"{safe_name}_subbed.mp4")
-
-            total_duration = self.get_duration(video_path)
-            if not total_duration:
-                self.error_occurred.emit(video_name, "Could not determine video duration")
+                self.classify(path, loose_videos, loose_subs)
+        if loose_videos or loose_subs:
+            self.match_group(loose_videos, loose_subs, leftover_videos, leftover_subs)
+
+        # Depth-first walk; every folder is matched and streamed as soon as it is read
+        stack = list(reversed(folders))
+        while stack and self.is_running:
+            folder = stack.pop()
+            videos, subtitles, subfolders = [], [], []
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if not self.is_running:
+                            break
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive and not entry.name.startswith("."):
+                                    subfolders.append(entry.path)
+                            elif entry.is_file():
+                                self.classify(entry.path, videos, subtitles)
+                        except OSError:
+                            continue
+            except OSError as e:
+                self.scan_error.emit(f"Cannot read {folder}: {e.strerror or e}")
                 continue
 
-            video_size = self.get_file_size_mb(video_path)
-            subtitle_size = self.get_file_size_mb(subtitle_path)
-            input_total_size = video_size + subtitle_size
+            self.match_group(videos, subtitles, leftover_videos, leftover_subs)
+            stack.extend(sorted(subfolders, reverse=True))
 
-            # Build subtitle filter with custom settings
-            subtitle_filter_path = subtitle_path.replace("\\", "/").replace(":", "\\:")
+        self.flush(force=True)
 
-            # Build force_style based on enabled settings
-            force_style_parts = []
+        # Subtitles kept in a sibling folder (Subs/, etc.) get a second chance
+        if self.is_running and leftover_videos and leftover_subs:
+            matches = SubtitleMatcher(leftover_subs).match(leftover_videos)
+            resolved = {video: sub for video, sub in matches.items() if sub}
+            if resolved:
+                self.subtitles_resolved.emit(resolved)
 
-            if self.subtitle_settings.get('font_enabled', False):
-                font_size = self.subtitle_settings.get('font_size', 16)
-                font_name = self.subtitle_settings.get('font_name', 'Arial')
-                force_style_parts.append(f"FontSize={font_size}")
-                force_style_parts.append(f"FontName={font_name}")
-
-            if self.subtitle_settings.get('color_enabled', False):
-                color = self.subtitle_settings.get('font_color', '#FFFFFF')
-                # Convert hex to BGR for ASS format
-                if color.startswith('#'):
-                    hex_color = color[1:]
-                    r = int(hex_color[0:2], 16)
-                    g = int(hex_color[2:4], 16)
-                    b = int(hex_color[4:6], 16)
-                    bgr_color = f"&H00{b:02X}{g:02X}{r:02X}"
-                    force_style_parts.append(f"PrimaryColour={bgr_color}")
+        self.scan_finished.emit(self.video_count, not self.is_running)
 
-            if self.subtitle_settings.get('border_enabled', False):
-                border_style = self.subtitle_settings.get('border_style', 3)
-                force_style_parts.append(f"BorderStyle={border_style}")
-                force_style_parts.append(f"Outline=2")
-                force_style_parts.append(f"Shadow=1")
-
-            # Default minimal styling if nothing is enabled
-            if not force_style_parts:
-                force_style_parts = ["FontSize=16", "BorderStyle=3", "Outline=2"]
-
-            force_style = ",".join(force_style_parts)
-
-            cmd = [
-                "ffmpeg", "-y", "-i", video_path,
-                "-vf", f"subtitles='{subtitle_filter_path}':force_style='{force_style}'",
-                "-c:v", "libx264", "-preset", self.speed_preset,
-                "-c:a", "copy",
-                "-movflags", "+faststart",
-                output_path
-            ]
-
-            # Add CRF if enabled
-            if self.subtitle_settings.get('crf_enabled', False):
-                crf_value = self.subtitle_settings.get('crf_value', 23)
-                cmd.insert(-3, "-crf")
-                cmd.insert(-3, str(crf_value))
+    def classify(self, path, videos, subtitles):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in self.VIDEO_EXTS:
+            videos.append(path)
+        elif ext in self.SUBTITLE_EXTS:
+            subtitles.append(path)
 
-            try:
-                process = subprocess.Popen(
-                    cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
-                    universal_newlines=True, bufsize=0
-                )
-
-                for line in process.stderr:
-                    if not self.is_running or self.skip_requested or self.cancelled:
-                        process.terminate()
-                        if self.skip_requested:
-                            self.video_completed.emit(video_name, False, "")
-                        break
-
-                    if "time=" in line:
-                        match = re.search(r"time=(\d+):(\d+):(\d+.\d)", line)
-                        if match:
-                            h, m, s = map(float, match.groups())
-                            current_sec = h * 3600 + m * 60 + s
-                            percent = min((current_sec / total_duration) * 100, 99)
-                            output_size = self.get_file_size_mb(output_path)
-                            eta = self.calculate_eta(percent, total_videos)
-
-                            self.progress_updated.emit(
-                                int(percent), video_name, output_size, input_total_size, video_size, eta
-                            )
-
-                if not self.skip_requested and not self.cancelled:
-                    process.wait()
-                    success = process.returncode == 0 and self.is_running
-                    if success:
-                        success_count += 1
-                        self.video_completed.emit(video_name, True, output_path)
-                    else:
-                        self.error_occurred.emit(video_name, "FFmpeg processing failed")
-                        self.video_completed.emit(video_name, False, "")
-
-            except Exception as e:
-                self.error_occurred.emit(video_name, str(e))
-                self.video_completed.emit(video_name, False, "")
-
-            self.processed_count += 1
-
-        if self.is_running and not self.cancelled:
-            self.all_completed.emit(success_count, total_videos)
+    def match_group(self, videos, subtitles, leftover_videos, leftover_subs):
+        videos.sort()
+        matches = SubtitleMatcher(subtitles).match(videos) if subtitles else {}
+        claimed = set(matches.values())
 
-# ---DRAGGABLE TABLE WIDGET--- #
-class DraggableTableWidget(QTableWidget):
-    def __init__(self):
-        super().__init__()
-        self.setDragDropMode(QTableWidget.DragDropMode.InternalMove)
-        self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        for video in videos:
+            subtitle = matches.get(video)
+            if not subtitle:
+                leftover_videos.append(video)
+            self.batch.append((video, subtitle))
+        leftover_subs.extend(sub for sub in subtitles if sub not in claimed)
 
-    
+        self.video_count += len(videos)
+        self.flush()
 
-    def dropEvent(self, event):
-        if event.source() == self:
-            rows = sorted(set(item.row() for item in self.selectedItems()))
-            target_row = self.drop_indicator_position()
-
-            if target_row == -1:
-                target_row = self.rowCount()
-
-            # Store the data from selected rows
-            rows_data = []
-            for row in reversed(rows):  # Reverse to maintain order
-                row_data = []
-                for col in range(self.columnCount()):
-                    item = self.item(row, col)
-                    widget = self.cellWidget(row, col)
-                    if widget:
-                        if isinstance(widget, QCheckBox):
-                            row_data.append(('checkbox', widget.isChecked()))
-                        elif isinstance(widget, QPushButton):
-                            row_data.append(('button', widget.text()))
-                        else:
-                            row_data.append(('widget', None))
-                    elif item:
-                        row_data.append(('item', item.clone()))
-                    else:
-                        row_data.append(('empty', None))
-                rows_data.append(row_data)
-                self.removeRow(row)
-
-            # Adjust target row after removals
-            for row in rows:
-                if row < target_row:
-                    target_row -= 1
-
-            # Insert rows at target position
-            for i, row_data in enumerate(reversed(rows_data)):
-                self.insertRow(target_row + i)
-                for col, (data_type, data) in enumerate(row_data):
-                    if data_type == 'checkbox':
-                        checkbox = QCheckBox()
-                        checkbox.setChecked(data)
-                        checkbox.stateChanged.connect(self.parent().update_ui_state)
-                        self.setCellWidget(target_row + i, col, checkbox)
-                    elif data_type == 'button':
-                        browse_btn = QPushButton("Browse")
-                        browse_btn.setIcon(qta.icon('fa5s.folder-open', color='#007bff'))
-                        browse_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #007bff; text-decoration: underline; }")
-                        browse_btn.clicked.connect(lambda checked, r=target_row + i: self.parent().browse_subtitle(r))
-                        self.setCellWidget(target_row + i, col, browse_btn)
-                    elif data_type == 'item':
-                        self.setItem(target_row + i, col, data)
-
-            event.accept()
-        else:
-            super().dropEvent(event)
-
-    def drop_indicator_position(self):
-        return self.rowAt(self.mapFromGlobal(self.cursor().pos()).y())
+    def flush(self, force=False):
+        if not self.batch:
+            return
+        if force or len(self.batch) >= self.batch_size or time.time() - self.last_flush >= self.batch_interval:
+            self.pairs_found.emit(self.batch)
+            self.batch = []
+            self.last_flush = time.time()
 
 
-# ---SUBTITLE PREVIEW WIDGET--- #
-class SubtitlePreviewWidget(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setStyleSheet("""
-          QWidget{ background:#2b2b2b; border:2px solid #555; border-radius:8px; }
-        """)
-        self.current_video_path = None
-        self.subtitle_template_content = "Sample subtitle text to preview your styling changes"
+# ---FFMPEG PROBE THREAD CLASS--- #
+class FFmpegProbeThread(QThread):
+    """Runs the cached ffmpeg capability probe off the GUI thread"""
+    probed = pyqtSignal(object)
 
-        # 1) video widget (without integrated subtitles)
-        self.video_widget = QVideoWidget()
-        self.video_widget.setMinimumSize(640, 360)
-        self.video_widget.setStyleSheet("background-color: #000000;")
+    def run(self):
+        self.probed.emit(probe_ffmpeg())
 
-        # 2) media player setup
-        self.media_player = QMediaPlayer(self)
-        self.audio_out = QAudioOutput(self)
-        self.media_player.setAudioOutput(self.audio_out)
-        self.media_player.setVideoOutput(self.video_widget)
 
-        # 3) Create and write subtitle template file
-        self.create_subtitle_template()
+# ---FILE TABLE MODEL--- #
+class FileTableModel(QAbstractTableModel):
+    COLUMNS = ["✓", "Video File", "Subtitle File", "Status"]
+    CHECK_COLUMN, VIDEO_COLUMN, SUBTITLE_COLUMN, STATUS_COLUMN = range(4)
 
-        # 4) Media controls
-        controls_layout = QHBoxLayout()
-        
-        self.play_pause_btn = QPushButton("▶")
-        self.play_pause_btn.setFixedSize(40, 30)
-        self.play_pause_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                font-size: 14px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-        """)
-        self.play_pause_btn.clicked.connect(self.toggle_play_pause)
-        
-        # Position slider
-        self.position_slider = QSlider(Qt.Orientation.Horizontal)
-        self.position_slider.setEnabled(False)
-        self.position_slider.sliderMoved.connect(self.set_position)
-        
-        # Time labels
-        self.time_label = QLabel("00:00 / 00:00")
-        self.time_label.setStyleSheet("color: white; font-size: 11px;")
-        
-        controls_layout.addWidget(self.play_pause_btn)
-        controls_layout.addWidget(self.position_slider)
-        controls_layout.addWidget(self.time_label)
+    STATUS_COLORS = {
+        'ready': QColor(40, 167, 69, 50),
+        'missing': QColor(220, 53, 69, 50),
+        'active': QColor(0, 123, 255, 50),
+        'done': QColor(40, 167, 69, 50),
+        'failed': QColor(220, 53, 69, 50),
+    }
 
-        # 5) Main layout
-        main_layout = QVBoxLayout()
-        main_layout.addWidget(self.video_widget, 1)
-        main_layout.addLayout(controls_layout)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = []
+        self.row_of = {}   # job id -> row, rebuilt whenever rows move
+        self.next_id = 0
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsDragEnabled
+        if index.column() == self.CHECK_COLUMN:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self.jobs[index.row()]
+        column = index.column()
 
-        outer_layout = QVBoxLayout(self)
-        outer_layout.setContentsMargins(5, 5, 5, 5)
-        outer_layout.addLayout(main_layout)
+        if column == self.CHECK_COLUMN:
+            if role == Qt.ItemDataRole.CheckStateRole:
+                return Qt.CheckState.Checked if job['checked'] else Qt.CheckState.Unchecked
+            return None
 
-        # Connect media player signals
-        self.media_player.positionChanged.connect(self.position_changed)
-        self.media_player.durationChanged.connect(self.duration_changed)
-        self.media_player.playbackStateChanged.connect(self.playback_state_changed)
+        path = job['video_path'] if column == self.VIDEO_COLUMN else job['subtitle_path']
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.STATUS_COLUMN:
+                return job['status']
+            if column == self.VIDEO_COLUMN and job['pinned']:
+                return f"📌 {os.path.basename(path)}"
+            return os.path.basename(path) if path else "Browse"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            if column == self.STATUS_COLUMN:
+                return job['tooltip']
+            if column == self.VIDEO_COLUMN and job['pinned']:
+                return f"{path}\nPinned: starts before unpinned videos, in table order"
+            return path or "Click to choose a subtitle file"
+        if role == Qt.ItemDataRole.UserRole:
+            return job['id'] if column == self.STATUS_COLUMN else path
+        if role == Qt.ItemDataRole.BackgroundRole:
+            if column == self.STATUS_COLUMN or (column == self.SUBTITLE_COLUMN and path):
+                return self.STATUS_COLORS.get(job['state'])
+        if role == Qt.ItemDataRole.ForegroundRole and column == self.SUBTITLE_COLUMN and not path:
+            return QColor("#007bff")
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if index.column() == self.CHECK_COLUMN and role == Qt.ItemDataRole.CheckStateRole:
+            self.jobs[index.row()]['checked'] = Qt.CheckState(value) == Qt.CheckState.Checked
+            self.dataChanged.emit(index, index, [role])
+            return True
+        return False
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column == self.CHECK_COLUMN:
+            key = lambda job: job['checked']
+        elif column == self.STATUS_COLUMN:
+            key = lambda job: job['status']
+        else:
+            path_key = 'video_path' if column == self.VIDEO_COLUMN else 'subtitle_path'
+            key = lambda job: os.path.basename(job[path_key] or "").lower()
+
+        self.layoutAboutToBeChanged.emit()
+        self.jobs.sort(key=key, reverse=(order == Qt.SortOrder.DescendingOrder))
+        # A column sort replaces any hand-made order
+        for job in self.jobs:
+            job['pinned'] = False
+        self.reindex()
+        self.layoutChanged.emit()
+
+    # --- Job access ---
+    def reindex(self):
+        self.row_of = {job['id']: row for row, job in enumerate(self.jobs)}
+
+    def job(self, row):
+        return self.jobs[row]
+
+    def job_by_id(self, job_id):
+        row = self.row_of.get(job_id)
+        return self.jobs[row] if row is not None else None
+
+    def clear(self):
+        self.beginResetModel()
+        self.jobs = []
+        self.row_of = {}
+        self.endResetModel()
+
+    def add_pairs(self, pairs):
+        """Append (video_path, subtitle_path) rows, skipping videos already listed"""
+        known = {job['video_path'] for job in self.jobs}
+        new_jobs = []
+        for video_path, subtitle_path in pairs:
+            if video_path in known:
+                continue
+            known.add(video_path)
+            self.next_id += 1
+            new_jobs.append({
+                'id': f"job-{self.next_id}",
+                'video_path': video_path,
+                'subtitle_path': subtitle_path,
+                'checked': bool(subtitle_path),
+                'status': "Ready" if subtitle_path else "No subtitle",
+                'state': 'ready' if subtitle_path else 'missing',
+                'tooltip': None,
+                'pinned': False,
+            })
+        if not new_jobs:
+            return 0
+
+        first = len(self.jobs)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_jobs) - 1)
+        self.jobs.extend(new_jobs)
+        for row in range(first, len(self.jobs)):
+            self.row_of[self.jobs[row]['id']] = row
+        self.endInsertRows()
+        return len(new_jobs)
+
+    def set_subtitle(self, job_id, subtitle_path):
+        row = self.row_of.get(job_id)
+        if row is None:
+            return
+        job = self.jobs[row]
+        job.update(subtitle_path=subtitle_path, checked=True, status="Ready", state='ready', tooltip=None)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.STATUS_COLUMN))
+
+    def set_status(self, job_id, status, state, tooltip=None):
+        """Update one job's status cell in place"""
+        row = self.row_of.get(job_id)
+        if row is None:
+            return
+        job = self.jobs[row]
+        job.update(status=status, state=state, tooltip=tooltip)
+        index = self.index(row, self.STATUS_COLUMN)
+        self.dataChanged.emit(index, index)
+
+    def set_statuses(self, updates):
+        """Apply {job_id: (status, state)} and repaint the affected span once"""
+        rows = []
+        for job_id, (status, state) in updates.items():
+            row = self.row_of.get(job_id)
+            if row is not None:
+                self.jobs[row].update(status=status, state=state, tooltip=None)
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), self.STATUS_COLUMN),
+                                  self.index(max(rows), self.STATUS_COLUMN))
+
+    def set_all_checked(self, checked):
+        for job in self.jobs:
+            if job['subtitle_path']:
+                job['checked'] = checked
+        if self.jobs:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.jobs) - 1, 0),
+                                  [Qt.ItemDataRole.CheckStateRole])
+
+    def selection_counts(self):
+        """(checked rows with a subtitle, rows with a subtitle)"""
+        available = [job for job in self.jobs if job['subtitle_path']]
+        return sum(1 for job in available if job['checked']), len(available)
+
+    def checked_jobs(self):
+        return [job for job in self.jobs if job['checked'] and job['subtitle_path']]
+
+    def pin_jobs(self, job_ids):
+        """Pin dragged rows: they run first, in table order, instead of being scheduled by size"""
+        rows = []
+        for job_id in job_ids:
+            row = self.row_of.get(job_id)
+            if row is not None:
+                self.jobs[row]['pinned'] = True
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), self.VIDEO_COLUMN),
+                                  self.index(max(rows), self.VIDEO_COLUMN))
+
+    def move_rows(self, rows, target_row):
+        """Move the given rows so they start at target_row, keeping their order"""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        moving = [self.jobs[row] for row in rows]
+        remaining = [job for row, job in enumerate(self.jobs) if row not in set(rows)]
+        target_row -= sum(1 for row in rows if row < target_row)
+        target_row = max(0, min(target_row, len(remaining)))
+
+        self.layoutAboutToBeChanged.emit()
+        self.jobs = remaining[:target_row] + moving + remaining[target_row:]
+        self.reindex()
+        self.layoutChanged.emit()
+
+
+# ---TABLE DELEGATES--- #
+class CheckBoxDelegate(QStyledItemDelegate):
+    """Draws the check column as a centered checkbox, no per-row widgets"""
+
+    def paint(self, painter, option, index):
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        style = opt.widget.style() if opt.widget else QApplication.style()
+
+        # Background and selection only, the box is drawn centered below
+        opt.features &= ~QStyleOptionViewItem.ViewItemFeature.HasCheckIndicator
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt, painter, opt.widget)
+
+        box = QStyleOptionButton()
+        size = style.subElementRect(QStyle.SubElement.SE_CheckBoxIndicator, box, opt.widget).size()
+        box.rect = QRect(option.rect.center().x() - size.width() // 2,
+                         option.rect.center().y() - size.height() // 2,
+                         size.width(), size.height())
+        checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+        box.state = QStyle.StateFlag.State_Enabled | (QStyle.StateFlag.State_On if checked else QStyle.StateFlag.State_Off)
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_IndicatorCheckBox, box, painter, opt.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.Type.MouseButtonRelease and option.rect.contains(event.position().toPoint()):
+            checked = index.data(Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Checked
+            new_state = Qt.CheckState.Unchecked if checked else Qt.CheckState.Checked
+            return model.setData(index, new_state.value, Qt.ItemDataRole.CheckStateRole)
+        return event.type() in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonDblClick)
+
+
+class BrowseLinkDelegate(QStyledItemDelegate):
+    """Draws a 'Browse' link in the subtitle column for rows without a subtitle"""
 
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.icon = None
 
+    def paint(self, painter, option, index):
+        if index.data(Qt.ItemDataRole.UserRole):
+            super().paint(painter, option, index)
+            return
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.font.setUnderline(True)
+        if self.icon is None:
+            import qtawesome as qta
+            self.icon = qta.icon('fa5s.folder-open', color='#007bff')
+        opt.icon = self.icon
+        opt.features |= QStyleOptionViewItem.ViewItemFeature.HasDecoration
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ItemViewItem, opt, painter, opt.widget)
+
+
+# ---DRAGGABLE TABLE VIEW--- #
+class DraggableTableView(QTableView):
+    files_dropped = pyqtSignal(list)
+    rows_moved = pyqtSignal(list)
 
-    def create_subtitle_template(self):
-        """Create a subtitle template file that will be loaded with videos"""
-        template_path = "subtitle_template.srt"
-        
-        # Create a simple SRT with sample text that appears at 30 seconds
-        srt_content = """1
-00:00:30,000 --> 00:01:00,000
-Sample subtitle text to preview your styling changes
-
-2
-00:01:00,000 --> 00:01:30,000
-This is how your subtitles will appear with the current settings
-
-3
-00:01:30,000 --> 00:02:00,000
-Change font, color, and border settings in the Advanced Settings dialog
-"""
-        
-        try:
-            with open(template_path, 'w', encoding='utf-8') as f:
-                f.write(srt_content)
-            self.subtitle_template_path = template_path
-        except Exception as e:
-            print(f"Could not create subtitle template: {e}")
-            self.subtitle_template_path = None
-
-    def load_video(self, file_path):
-        """Load video with subtitle template overlay"""
-        self.current_video_path = file_path
-        self.media_player.setSource(QUrl.fromLocalFile(file_path))
-        
-        # Wait for the media to be loaded before seeking
-        def on_media_status_changed():
-            if self.media_player.mediaStatus() == QMediaPlayer.MediaStatus.LoadedMedia:
-                # Seek to 30 seconds (30000 milliseconds)
-                self.media_player.setPosition(30000)
-                self.media_player.pause()
-                self.position_slider.setEnabled(True)
-                # Disconnect the signal to avoid multiple calls
-                self.media_player.mediaStatusChanged.disconnect(on_media_status_changed)
-        
-        self.media_player.mediaStatusChanged.connect(on_media_status_changed)
-        self.media_player.play()  # Start playing to trigger loading
+    def __init__(self):
+        super().__init__()
+        self.setDragDropMode(QTableView.DragDropMode.InternalMove)
+        self.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.setAcceptDrops(True)
 
-    def toggle_play_pause(self):
-        """Toggle between play and pause"""
-        if self.media_player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-            self.media_player.pause()
+    def dragEnterEvent(self, event):
+        if event.source() != self and event.mimeData().hasUrls():
+            event.acceptProposedAction()
         else:
-            self.media_player.play()
+            super().dragEnterEvent(event)
 
-    def set_position(self, position):
-        """Set media player position from slider"""
-        self.media_player.setPosition(position)
+    def dragMoveEvent(self, event):
+        if event.source() == self or event.mimeData().hasUrls():
+            event.acceptProposedAction()
+        else:
+            super().dragMoveEvent(event)
 
-    def position_changed(self, position):
-        """Update slider when media position changes"""
-        self.position_slider.setValue(position)
-        
-        # Update time display
-        duration = self.media_player.duration()
-        if duration > 0:
-            current_time = self.format_time(position)
-            total_time = self.format_time(duration)
-            self.time_label.setText(f"{current_time} / {total_time}")
-
-    def duration_changed(self, duration):
-        """Update slider range when duration is known"""
-        self.position_slider.setRange(0, duration)
-
-    def playback_state_changed(self, state):
-        """Update play/pause button when playback state changes"""
-        if state == QMediaPlayer.PlaybackState.PlayingState:
-            self.play_pause_btn.setText("⏸")
+    def dropEvent(self, event):
+        if event.source() != self and event.mimeData().hasUrls():
+            # Files and folders from the file manager go through the scanner
+            paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+            if paths:
+                self.files_dropped.emit(paths)
+            event.acceptProposedAction()
+        elif event.source() == self:
+            rows = sorted(index.row() for index in self.selectionModel().selectedRows())
+            target_row = self.rowAt(event.position().toPoint().y())
+            if target_row == -1:
+                target_row = self.model().rowCount()
+
+            model = self.model()
+            moved_ids = [model.job(row)['id'] for row in rows]
+            model.move_rows(rows, target_row)
+            self.rows_moved.emit(moved_ids)
+
+            # Keep the moved rows selected at their new position
+            self.clearSelection()
+            for job_id in moved_ids:
+                self.selectRow(model.row_of[job_id])
+            event.setDropAction(Qt.DropAction.CopyAction)  # the model already moved them
+            event.accept()
         else:
-            self.play_pause_btn.setText("▶")
-
-    def format_time(self, milliseconds):
-        """Format time in milliseconds to MM:SS"""
-        seconds = int(milliseconds / 1000)
-        minutes = seconds // 60
-        seconds = seconds % 60
-        return f"{minutes:02d}:{seconds:02d}"
-    
-    def cleanup(self):
-        """Clean up resources"""
-        if hasattr(self, 'media_player'):
-            self.media_player.stop()
-            self.media_player.setSource(QUrl())
-        
-        # Clean up temporary files
-        temp_files = ["temp_preview_with_subs.mp4"]
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+            super().dropEvent(event)
 
-    def update_preview(self, font_size=16, font_color="#FFFFFF", font_name="Arial", border_style=3):
-        """Update subtitle template and reload video to show changes"""
-        # Update the subtitle template content with styling info
-        self.update_subtitle_template_with_styling(font_size, font_color, font_name, border_style)
-        
-        # If a video is loaded, reload it to apply new subtitle styling
-        if self.current_video_path and self.subtitle_template_path:
-            # Stop current playback first
-            self.media_player.stop()
-            # Small delay to ensure clean stop
-            from PyQt6.QtCore import QTimer
-            QTimer.singleShot(100, lambda: self.load_video_with_subtitles(self.current_video_path))
-
-    def update_subtitle_template_with_styling(self, font_size, font_color, font_name, border_style):
-        """Update subtitle template with current styling settings"""
-        if not self.subtitle_template_path:
-            return
-            
-        # Create subtitle content that reflects current settings
-        style_info = f"Font: {font_name}, Size: {font_size}, Color: {font_color}"
-        border_names = ["Outline", "Drop Shadow", "Box Background", "Outline + Drop Shadow"]
-        border_info = border_names[border_style - 1] if 1 <= border_style <= 4 else "Box Background"
-        
-        srt_content = f"""1
-00:00:30,000 --> 00:01:00,000
-Sample subtitle text to preview your styling changes
-
-2
-00:01:00,000 --> 00:01:30,000
-{style_info}
-
-3
-00:01:30,000 --> 00:02:00,000
-Border Style: {border_info}
-"""
-        
-        try:
-            with open(self.subtitle_template_path, 'w', encoding='utf-8') as f:
-                f.write(srt_content)
-        except Exception as e:
-            print(f"Could not update subtitle template: {e}")
-
-    def load_video_with_subtitles(self, video_path):
-        """Load video with subtitle overlay by creating a temporary video with burned-in subtitles"""
-        if not self.subtitle_template_path or not os.path.exists(self.subtitle_template_path):
-            self.load_video(video_path)
-            return
-            
-        # Create a temporary video with subtitle overlay for preview (small segment for performance)
-        temp_video_path = "temp_preview_with_subs.mp4"
-        
-        try:
-            # Create a short preview video (30 seconds starting from 30s mark) with subtitles burned in
-            subprocess.run([
-                "ffmpeg", "-y", "-ss", "30", "-t", "30", "-i", video_path,
-                "-vf", f"subtitles='{self.subtitle_template_path.replace(':', '\\:')}'",
-                "-c:v", "libx264", "-preset", "ultrafast", "-crf", "28",
-                "-c:a", "copy", temp_video_path
-            ], capture_output=True, check=True)
-            
-            # Load the temporary video with burned-in subtitles
-            self.load_video(temp_video_path)
-            
-        except subprocess.CalledProcessError as e:
-            print(f"Error creating preview with subtitles: {e}")
-            # Fallback to original video
-            self.load_video(video_path)
-        except Exception as e:
-            print(f"Error loading video with subtitles: {e}")
-            self.load_video(video_path)
 
 # ---ADVANCED SETTINGS DIALOG--- #
 class AdvancedSettingsDialog(QDialog):
+    OUTPUT_MODES = [
+        ('auto', "Automatic (by destination)"),
+        ('faststart', "MP4, fast start"),
+        ('fragmented', "MP4, fragmented"),
+        ('mkv', "MKV"),
+    ]
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Advanced Subtitle Settings")
@@ -748,6 +665,143 @@ class AdvancedSettingsDialog(QDialog):
         self.crf_settings_widget.setEnabled(False)
         tabs.addTab(quality_tab, "Quality")
 
+        # Processing Settings Tab
+        processing_tab = QWidget()
+        processing_layout = QVBoxLayout(processing_tab)
+
+        self.segment_group = QButtonGroup()
+        self.segment_enabled = QRadioButton("Split Long Videos Across Parallel Jobs")
+        self.segment_disabled = QRadioButton("Encode Each Video As One Job")
+        self.segment_disabled.setChecked(True)
+        self.segment_group.addButton(self.segment_enabled)
+        self.segment_group.addButton(self.segment_disabled)
+
+        processing_layout.addWidget(self.segment_enabled)
+        processing_layout.addWidget(self.segment_disabled)
+
+        self.segment_settings_widget = QWidget()
+        segment_settings_layout = QFormLayout(self.segment_settings_widget)
+
+        # Minimum length before a video is split
+        self.segment_min_minutes = QSpinBox()
+        self.segment_min_minutes.setRange(1, 600)
+        self.segment_min_minutes.setValue(20)
+        self.segment_min_minutes.setSuffix(" min")
+        segment_settings_layout.addRow("Split Videos Longer Than:", self.segment_min_minutes)
+
+        segment_hint = QLabel("Videos are cut at keyframes, each part is encoded by its own job,\n"
+                              "then the parts are joined without re-encoding. Uses the Parallel Jobs count.")
+        segment_hint.setStyleSheet("color: #666; font-size: 11px;")
+        segment_settings_layout.addRow(segment_hint)
+
+        processing_layout.addWidget(self.segment_settings_widget)
+
+        self.smart_render_check = QCheckBox("Re-encode Only Scenes With Subtitles (Smart Render)")
+        self.smart_render_check.setToolTip(
+            "Only the keyframe groups that overlap a subtitle cue are re-encoded, the rest is copied.\n"
+            "Works with H.264 sources; other videos are encoded normally."
+        )
+        processing_layout.addWidget(self.smart_render_check)
+
+        self.longest_first_check = QCheckBox("Start the Longest Videos First")
+        self.longest_first_check.setChecked(True)
+        self.longest_first_check.setToolTip(
+            "With parallel jobs, videos start by length and resolution, largest first,\n"
+            "so a long movie doesn't run alone at the end. Rows you drag into place are pinned\n"
+            "and start first, in table order."
+        )
+        processing_layout.addWidget(self.longest_first_check)
+
+        output_mode_layout = QFormLayout()
+        self.output_mode = QComboBox()
+        for mode, label in self.OUTPUT_MODES:
+            self.output_mode.addItem(label, mode)
+        self.output_mode.setToolTip(
+            "Fast-start MP4 is rewritten once more after encoding, which takes minutes for large files\n"
+            "on a NAS or spinning disk. Fragmented MP4 and MKV are written in one pass, and a file cut\n"
+            "off by a crash or cancel still plays. Automatic uses fragmented MP4 on network shares and\n"
+            "spinning disks, fast-start MP4 elsewhere."
+        )
+        output_mode_layout.addRow("Output Format:", self.output_mode)
+
+        scratch_row = QHBoxLayout()
+        self.scratch_folder = QLineEdit()
+        self.scratch_folder.setPlaceholderText("Off: encode straight into the output folder")
+        self.scratch_folder.setToolTip(
+            "Encodes are written to this fast local folder (an SSD or RAM disk) and moved to the\n"
+            "output folder once finished, while the next video is already encoding. Files only\n"
+            "appear in the output folder when they are complete."
+        )
+        scratch_browse_btn = QPushButton("Browse")
+        scratch_browse_btn.clicked.connect(self.browse_scratch_folder)
+        scratch_row.addWidget(self.scratch_folder)
+        scratch_row.addWidget(scratch_browse_btn)
+        output_mode_layout.addRow("Scratch Folder:", scratch_row)
+
+        prefetch_row = QHBoxLayout()
+        self.prefetch_check = QCheckBox("Copy Upcoming Videos to Local Disk")
+        self.prefetch_check.setToolTip(
+            "For sources on a network share or slow disk: while one video encodes, the next ones\n"
+            "are copied to the scratch folder (or the system temp folder), so ffmpeg never waits\n"
+            "on the network. Copies are deleted as soon as their video is done."
+        )
+        self.prefetch_budget = QSpinBox()
+        self.prefetch_budget.setRange(1, 1000)
+        self.prefetch_budget.setValue(20)
+        self.prefetch_budget.setSuffix(" GB")
+        self.prefetch_budget.setToolTip("Most disk space the local copies may take at once")
+        self.prefetch_budget.setEnabled(False)
+        self.prefetch_check.toggled.connect(self.prefetch_budget.setEnabled)
+        prefetch_row.addWidget(self.prefetch_check)
+        prefetch_row.addWidget(self.prefetch_budget)
+        output_mode_layout.addRow("Read Ahead:", prefetch_row)
+
+        disk_check_row = QHBoxLayout()
+        self.disk_check = QCheckBox("Hold Back Jobs When Disk Space Runs Low")
+        self.disk_check.setChecked(True)
+        self.disk_check.setToolTip(
+            "Each job's output size is estimated from its source and from earlier encodes with the\n"
+            "same settings. A job only starts if it fits in the scratch and output folders next to\n"
+            "what the running jobs still have to write, leaving this much free."
+        )
+        self.min_free = QSpinBox()
+        self.min_free.setRange(0, 1000)
+        self.min_free.setValue(2)
+        self.min_free.setSuffix(" GB free")
+        self.disk_check.toggled.connect(self.min_free.setEnabled)
+        disk_check_row.addWidget(self.disk_check)
+        disk_check_row.addWidget(self.min_free)
+        output_mode_layout.addRow("Disk Space:", disk_check_row)
+        processing_layout.addLayout(output_mode_layout)
+
+        self.output_cache_check = QCheckBox("Reuse Outputs of Identical Earlier Jobs")
+        self.output_cache_check.setChecked(True)
+        self.output_cache_check.setToolTip(
+            "A video already encoded with the same subtitle and settings is linked or copied\n"
+            "from the earlier output instead of being encoded again."
+        )
+        processing_layout.addWidget(self.output_cache_check)
+
+        self.cache_full_hash_check = QCheckBox("Verify Cache Matches With Full-File Hashes (Slower)")
+        self.cache_full_hash_check.setToolTip(
+            "By default videos are identified by their size and a sample of chunks across the file.\n"
+            "Full hashes read every byte of every video before processing starts."
+        )
+        self.output_cache_check.toggled.connect(self.cache_full_hash_check.setEnabled)
+        processing_layout.addWidget(self.cache_full_hash_check)
+
+        refresh_layout = QFormLayout()
+        self.ui_refresh_hz = QSpinBox()
+        self.ui_refresh_hz.setRange(1, 30)
+        self.ui_refresh_hz.setValue(5)
+        self.ui_refresh_hz.setSuffix(" Hz")
+        self.ui_refresh_hz.setToolTip("How often progress is redrawn, regardless of how many videos are encoding")
+        refresh_layout.addRow("Progress Refresh Rate:", self.ui_refresh_hz)
+        processing_layout.addLayout(refresh_layout)
+        processing_layout.addStretch()
+        self.segment_settings_widget.setEnabled(False)
+        tabs.addTab(processing_tab, "Processing")
+
         layout.addWidget(tabs)
 
         # Create horizontal layout for tabs and Save/Load buttons
@@ -801,10 +855,11 @@ class AdvancedSettingsDialog(QDialog):
         # Preview
         preview_group = QGroupBox("Preview")
         preview_layout = QVBoxLayout(preview_group)
+        from hardsubber_preview import SubtitlePreviewWidget
         self.preview_widget = SubtitlePreviewWidget()
         
         # Auto-load the first checked video from the table if available
-        if parent and hasattr(parent, 'files_table'):
+        if parent and hasattr(parent, 'files_model'):
             self.auto_load_table_video(parent)
             
         preview_layout.addWidget(self.preview_widget)
@@ -819,6 +874,7 @@ class AdvancedSettingsDialog(QDialog):
         self.border_enabled.toggled.connect(lambda checked: self.border_settings_widget.setEnabled(checked))
         self.border_enabled.toggled.connect(self.update_preview)
         self.crf_enabled.toggled.connect(lambda checked: self.crf_settings_widget.setEnabled(checked))
+        self.segment_enabled.toggled.connect(lambda checked: self.segment_settings_widget.setEnabled(checked))
 
         # Buttons
         button_layout = QHBoxLayout()
@@ -836,47 +892,31 @@ class AdvancedSettingsDialog(QDialog):
     def closeEvent(self, event):
         """Clean up resources when dialog is closed"""
         if hasattr(self, 'preview_widget') and self.preview_widget:
-            # Stop the media player
-            if hasattr(self.preview_widget, 'media_player'):
-                self.preview_widget.media_player.stop()
+            # Stop the frame renderer
+            self.preview_widget.cleanup()
         super().closeEvent(event)
 
     def reject(self):
         """Override reject to ensure cleanup"""
         if hasattr(self, 'preview_widget') and self.preview_widget:
-            if hasattr(self.preview_widget, 'media_player'):
-                self.preview_widget.media_player.stop()
+            self.preview_widget.cleanup()
         super().reject()
 
     def accept(self):
         """Override accept to ensure cleanup"""
         if hasattr(self, 'preview_widget') and self.preview_widget:
-            if hasattr(self.preview_widget, 'media_player'):
-                self.preview_widget.media_player.stop()
+            self.preview_widget.cleanup()
         super().accept()
 
     def auto_load_table_video(self, parent):
         """Auto-load the first checked video from the parent's table"""
         try:
-            for row in range(parent.files_table.rowCount()):
-                cb = parent.files_table.cellWidget(row, 0)
-                if cb and cb.isChecked():
-                    video_item = parent.files_table.item(row, 1)
-                    if video_item:
-                        path = video_item.data(Qt.ItemDataRole.UserRole)
-                        if path and os.path.exists(path):
-                            self.preview_widget.load_video(path)
-                            return
-            
-            # If no checked video, try the first video with a subtitle
-            for row in range(parent.files_table.rowCount()):
-                video_item = parent.files_table.item(row, 1)
-                subtitle_item = parent.files_table.item(row, 2)
-                if video_item and subtitle_item and subtitle_item.data(Qt.ItemDataRole.UserRole):
-                    path = video_item.data(Qt.ItemDataRole.UserRole)
-                    if path and os.path.exists(path):
-                        self.preview_widget.load_video(path)
-                        return
+            jobs = parent.files_model.jobs
+            # First checked video, otherwise the first video with a subtitle
+            for job in [job for job in jobs if job['checked']] + [job for job in jobs if job['subtitle_path']]:
+                if os.path.exists(job['video_path']):
+                    self.preview_widget.load_video(job['video_path'])
+                    return
         except Exception:
             pass  # Silently fail if no videos available
 
@@ -912,12 +952,16 @@ class AdvancedSettingsDialog(QDialog):
 
     def update_preview(self):
         if hasattr(self, 'preview_widget'):
-            self.preview_widget.update_preview(
-                self.font_size.value(),
-                self.font_color.text(),
-                self.font_name.text(),
-                self.border_style.currentIndex() + 1
-            )
+            self.preview_widget.update_preview(self.get_settings())
+
+    def browse_scratch_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Scratch Folder", self.scratch_folder.text())
+        if folder:
+            self.scratch_folder.setText(folder)
+
+    def set_output_mode(self, mode):
+        index = self.output_mode.findData(mode)
+        self.output_mode.setCurrentIndex(max(index, 0))
 
     def get_settings(self):
         return {
@@ -929,7 +973,20 @@ class AdvancedSettingsDialog(QDialog):
             'border_enabled': self.border_enabled.isChecked(),
             'border_style': self.border_style.currentIndex() + 1,
             'crf_enabled': self.crf_enabled.isChecked(),
-            'crf_value': self.crf_slider.value()
+            'crf_value': self.crf_slider.value(),
+            'segment_enabled': self.segment_enabled.isChecked(),
+            'segment_min_minutes': self.segment_min_minutes.value(),
+            'smart_render_enabled': self.smart_render_check.isChecked(),
+            'schedule_longest_first': self.longest_first_check.isChecked(),
+            'output_mode': self.output_mode.currentData(),
+            'scratch_folder': self.scratch_folder.text().strip(),
+            'prefetch_enabled': self.prefetch_check.isChecked(),
+            'prefetch_budget_gb': self.prefetch_budget.value(),
+            'disk_check_enabled': self.disk_check.isChecked(),
+            'min_free_gb': self.min_free.value(),
+            'output_cache_enabled': self.output_cache_check.isChecked(),
+            'cache_full_hash': self.cache_full_hash_check.isChecked(),
+            'ui_refresh_hz': self.ui_refresh_hz.value()
         }
 
     def save_config(self):
@@ -987,6 +1044,21 @@ class AdvancedSettingsDialog(QDialog):
             self.crf_enabled.setChecked(config.get('crf_enabled', False))
             self.crf_disabled.setChecked(not config.get('crf_enabled', False))
             self.crf_slider.setValue(config.get('crf_value', 23))
+
+            self.segment_enabled.setChecked(config.get('segment_enabled', False))
+            self.segment_disabled.setChecked(not config.get('segment_enabled', False))
+            self.segment_min_minutes.setValue(config.get('segment_min_minutes', 20))
+            self.smart_render_check.setChecked(config.get('smart_render_enabled', False))
+            self.longest_first_check.setChecked(config.get('schedule_longest_first', True))
+            self.set_output_mode(config.get('output_mode', 'auto'))
+            self.scratch_folder.setText(config.get('scratch_folder', ''))
+            self.prefetch_check.setChecked(config.get('prefetch_enabled', False))
+            self.prefetch_budget.setValue(config.get('prefetch_budget_gb', 20))
+            self.disk_check.setChecked(config.get('disk_check_enabled', True))
+            self.min_free.setValue(config.get('min_free_gb', 2))
+            self.output_cache_check.setChecked(config.get('output_cache_enabled', True))
+            self.cache_full_hash_check.setChecked(config.get('cache_full_hash', False))
+            self.ui_refresh_hz.setValue(config.get('ui_refresh_hz', 5))
             
             # Update the preview
             self.update_preview()
@@ -997,8 +1069,12 @@ class AdvancedSettingsDialog(QDialog):
 class HardSubberGUI(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.video_pairs = []
         self.processor_thread = None
+        self.scanner_thread = None
+        self.journal = None
+        self.output_cache = None
+        self.ffmpeg_probe = None
+        self.ffmpeg_capabilities = None
         self.output_folder = None
         self.current_folder = None
         self.settings = QSettings("Nexus", "HardSubber")
@@ -1015,6 +1091,9 @@ class HardSubberGUI(QMainWindow):
         self.setup_status_bar()
         self.check_ffmpeg()
         self.load_settings()
+        QTimer.singleShot(0, self.load_icons)
+        QTimer.singleShot(0, self.offer_resume)
+        trace_startup("window built")
 
     def apply_modern_theme(self):
         self.setStyleSheet("""
@@ -1038,7 +1117,7 @@ class HardSubberGUI(QMainWindow):
                 color: #555555;
                 font-size: 13px;
             }
-            QTableWidget {
+            QTableView {
                 gridline-color: #e0e0e0;
                 background-color: white;
                 alternate-background-color: #f8f8f8;
@@ -1048,12 +1127,12 @@ class HardSubberGUI(QMainWindow):
                 selection-background-color: #007bff;
                 selection-color: white;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px 8px;
                 border-bottom: 1px solid #e0e0e0;
                 border-right: 1px solid #e0e0e0;
             }
-            QTableWidget::item:hover {
+            QTableView::item:hover {
                 background-color: #f0f8ff;
             }
             QHeaderView::section {
@@ -1175,13 +1254,10 @@ class HardSubberGUI(QMainWindow):
 
     def select_top_table_video(self):
         # pick the first checked/selected row:
-        for row in range(self.files_table.rowCount()):
-            cb = self.files_table.cellWidget(row, 0)
-            if cb and cb.isChecked():
-                path = self.files_table.item(row, 1).data(Qt.UserRole)
-                if path:
-                    self.preview_widget.load_video(path)
-                    return
+        for job in self.files_model.jobs:
+            if job['checked']:
+                self.preview_widget.load_video(job['video_path'])
+                return
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -1192,12 +1268,10 @@ class HardSubberGUI(QMainWindow):
         controls_layout = QHBoxLayout()
 
         self.input_folder_btn = QPushButton("Open Input Folder")
-        self.input_folder_btn.setIcon(qta.icon('fa5s.folder-open', color='white'))
         self.input_folder_btn.clicked.connect(self.select_input_folder)
         controls_layout.addWidget(self.input_folder_btn)
 
         self.output_folder_btn = QPushButton("Set Output Folder")
-        self.output_folder_btn.setIcon(qta.icon('fa5s.save', color='white'))
         self.output_folder_btn.clicked.connect(self.select_output_folder)
         controls_layout.addWidget(self.output_folder_btn)
 
@@ -1209,8 +1283,16 @@ class HardSubberGUI(QMainWindow):
         speed_layout.addWidget(self.speed_combo)
         controls_layout.addLayout(speed_layout)
 
+        jobs_layout = QHBoxLayout()
+        jobs_layout.addWidget(QLabel("Parallel Jobs:"))
+        self.jobs_spin = QSpinBox()
+        self.jobs_spin.setRange(1, os.cpu_count() or 1)
+        self.jobs_spin.setValue(1)
+        self.jobs_spin.setToolTip("Number of videos encoded side by side. Cores are split evenly between jobs.")
+        jobs_layout.addWidget(self.jobs_spin)
+        controls_layout.addLayout(jobs_layout)
+
         self.settings_btn = QPushButton("Advanced Settings")
-        self.settings_btn.setIcon(qta.icon('fa5s.cog', color='white'))
         self.settings_btn.clicked.connect(self.show_advanced_settings)
         controls_layout.addWidget(self.settings_btn)
 
@@ -1241,43 +1323,44 @@ class HardSubberGUI(QMainWindow):
         self.toggle_selection_btn.setEnabled(False)
         selection_layout.addWidget(self.toggle_selection_btn)
         selection_layout.addStretch()
+
+        self.stop_scan_btn = QPushButton("Stop Scan")
+        self.stop_scan_btn.clicked.connect(self.stop_scan)
+        self.stop_scan_btn.setVisible(False)
+        selection_layout.addWidget(self.stop_scan_btn)
         files_layout.addLayout(selection_layout)
 
-        self.files_table = DraggableTableWidget()
-        self.files_table.setColumnCount(4)
-        self.files_table.setHorizontalHeaderLabels(["✓", "Video File", "Subtitle File", "Status"])
+        self.files_model = FileTableModel(self)
+        self.files_model.dataChanged.connect(self.on_files_changed)
+        self.files_model.rowsInserted.connect(self.update_ui_state)
+        self.files_model.modelReset.connect(self.update_ui_state)
 
-        def _on_table_selection(self):
-            selected = self.files_table.selectedItems()
-            if not selected:
-                return
-            # column 1 is the video file
-            video_item = selected[0]  # first selected cell
-            if video_item.column() != 1:
-                # find the video-cell in the same row
-                video_item = self.files_table.item(video_item.row(), 1)
-            path = video_item.data(Qt.ItemDataRole.UserRole)
-            if path:
-                self.preview_widget.load_video(path)
+        self.files_table = DraggableTableView()
+        self.files_table.setModel(self.files_model)
+        self.files_table.setItemDelegateForColumn(FileTableModel.CHECK_COLUMN, CheckBoxDelegate(self.files_table))
+        self.files_table.setItemDelegateForColumn(FileTableModel.SUBTITLE_COLUMN, BrowseLinkDelegate(self.files_table))
+        self.files_table.files_dropped.connect(self.add_dropped_files)
+        self.files_table.rows_moved.connect(self.files_model.pin_jobs)
+        self.files_table.clicked.connect(self.on_table_clicked)
 
         # Configure table
         header = self.files_table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
-        header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Interactive)
 
         self.files_table.setColumnWidth(0, 50)
+        self.files_table.setColumnWidth(3, 140)
         self.files_table.setAlternatingRowColors(True)
-        self.files_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.files_table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
+        self.files_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.files_table.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         self.files_table.setFocusPolicy(Qt.FocusPolicy.NoFocus)
         self.files_table.setSortingEnabled(True)
         self.files_table.verticalHeader().setVisible(False)
+        self.files_table.verticalHeader().setDefaultSectionSize(34)
         self.files_table.setShowGrid(True)
-        self.files_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        
-        
+        self.files_table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
 
         files_layout.addWidget(self.files_table)
         main_layout.addWidget(files_group)
@@ -1310,21 +1393,19 @@ class HardSubberGUI(QMainWindow):
         button_layout = QHBoxLayout()
 
         self.start_btn = QPushButton("Start Processing")
-        self.start_btn.setIcon(qta.icon('fa5s.play', color='white'))
         self.start_btn.setStyleSheet("QPushButton { background-color: #28a745; } QPushButton:hover { background-color: #218838; }")
         self.start_btn.clicked.connect(self.start_processing)
         self.start_btn.setEnabled(False)
         button_layout.addWidget(self.start_btn)
 
         self.skip_btn = QPushButton("Skip Current")
-        self.skip_btn.setIcon(qta.icon('fa5s.forward', color='#000'))
         self.skip_btn.setStyleSheet("QPushButton { background-color: #ffc107; color: #000; } QPushButton:hover { background-color: #e0a800; }")
+        self.skip_btn.setToolTip("Skip every video that is currently encoding")
         self.skip_btn.clicked.connect(self.skip_current)
         self.skip_btn.setEnabled(False)
         button_layout.addWidget(self.skip_btn)
 
         self.cancel_btn = QPushButton("Cancel All")
-        self.cancel_btn.setIcon(qta.icon('fa5s.stop', color='white'))
         self.cancel_btn.setStyleSheet("QPushButton { background-color: #dc3545; } QPushButton:hover { background-color: #c82333; }")
         self.cancel_btn.clicked.connect(self.cancel_processing)
         self.cancel_btn.setEnabled(False)
@@ -1353,6 +1434,22 @@ class HardSubberGUI(QMainWindow):
             if self.subtitle_settings.get('crf_enabled', False):
                 dialog.crf_enabled.setChecked(True)
                 dialog.crf_slider.setValue(self.subtitle_settings.get('crf_value', 23))
+
+            if self.subtitle_settings.get('segment_enabled', False):
+                dialog.segment_enabled.setChecked(True)
+                dialog.segment_min_minutes.setValue(self.subtitle_settings.get('segment_min_minutes', 20))
+
+            dialog.smart_render_check.setChecked(self.subtitle_settings.get('smart_render_enabled', False))
+            dialog.longest_first_check.setChecked(self.subtitle_settings.get('schedule_longest_first', True))
+            dialog.set_output_mode(self.subtitle_settings.get('output_mode', 'auto'))
+            dialog.scratch_folder.setText(self.subtitle_settings.get('scratch_folder', ''))
+            dialog.prefetch_check.setChecked(self.subtitle_settings.get('prefetch_enabled', False))
+            dialog.prefetch_budget.setValue(self.subtitle_settings.get('prefetch_budget_gb', 20))
+            dialog.disk_check.setChecked(self.subtitle_settings.get('disk_check_enabled', True))
+            dialog.min_free.setValue(self.subtitle_settings.get('min_free_gb', 2))
+            dialog.output_cache_check.setChecked(self.subtitle_settings.get('output_cache_enabled', True))
+            dialog.cache_full_hash_check.setChecked(self.subtitle_settings.get('cache_full_hash', False))
+            dialog.ui_refresh_hz.setValue(self.subtitle_settings.get('ui_refresh_hz', 5))
         
         dialog.update_preview()
         
@@ -1377,23 +1474,51 @@ class HardSubberGUI(QMainWindow):
         speed = self.settings.value("speed_preset", "medium", type=str)
         if speed in [self.speed_combo.itemText(i) for i in range(self.speed_combo.count())]:
             self.speed_combo.setCurrentText(speed)
+        self.jobs_spin.setValue(self.settings.value("parallel_jobs", 1, type=int))
 
     def save_settings(self):
         self.settings.setValue("speed_preset", self.speed_combo.currentText())
+        self.settings.setValue("parallel_jobs", self.jobs_spin.value())
+
+    def load_icons(self):
+        """Button icons; qtawesome loads its fonts only after the window is on screen"""
+        import qtawesome as qta
+        icons = {
+            self.input_folder_btn: ('fa5s.folder-open', 'white'),
+            self.output_folder_btn: ('fa5s.save', 'white'),
+            self.settings_btn: ('fa5s.cog', 'white'),
+            self.stop_scan_btn: ('fa5s.stop', 'white'),
+            self.start_btn: ('fa5s.play', 'white'),
+            self.skip_btn: ('fa5s.forward', '#000'),
+            self.cancel_btn: ('fa5s.stop', 'white'),
+        }
+        for button, (name, color) in icons.items():
+            button.setIcon(qta.icon(name, color=color))
+        trace_startup("icons loaded")
 
     def check_ffmpeg(self):
-        try:
-            result = subprocess.run(["ffmpeg", "-version"],
-                                  stdout=subprocess.PIPE,
-                                  stderr=subprocess.PIPE,
-                                  text=True, timeout=10)
-            version_line = result.stdout.split('\n')[0]
-            self.status_bar.showMessage(f"FFmpeg detected: {version_line}")
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
+        self.status_bar.showMessage("Checking FFmpeg...")
+        self.ffmpeg_probe = FFmpegProbeThread(self)
+        self.ffmpeg_probe.probed.connect(self.ffmpeg_probed)
+        self.ffmpeg_probe.start()
+
+    def ffmpeg_probed(self, capabilities):
+        trace_startup("ffmpeg probed")
+        if not capabilities:
             QMessageBox.critical(self, "FFmpeg Not Found",
                                "FFmpeg is required but not found in your system PATH.\n"
                                "Please install FFmpeg to use this application.")
-            sys.exit(1)
+            QApplication.instance().exit(1)
+            return
+
+        self.ffmpeg_capabilities = capabilities
+        missing = [name for name, group in (('libx264', 'encoders'), ('subtitles', 'filters'))
+                   if name not in capabilities[group]]
+        if missing:
+            self.status_bar.showMessage(f"FFmpeg detected: {capabilities['version']} "
+                                        f"(missing {', '.join(missing)}, encoding will fail)")
+        else:
+            self.status_bar.showMessage(f"FFmpeg detected: {capabilities['version']}")
 
     def select_input_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Input Folder")
@@ -1405,147 +1530,92 @@ class HardSubberGUI(QMainWindow):
         self.input_folder_label.setText(folder)
         self.input_folder_label.setStyleSheet("color: #28a745; font-weight: bold;")
 
-        self.files_table.setRowCount(0)
-        self.video_pairs.clear()
-
-        video_exts = [".mp4", ".mkv", ".mov", ".avi", ".wmv", ".flv", ".webm"]
-        video_files = []
+        # The old scan must stop before its rows are cleared, or it keeps adding to the new table
+        self.stop_scan()
+        self.files_model.clear()
+        self.start_scan([folder])
 
-        try:
-            for file in os.listdir(folder):
-                if any(file.lower().endswith(ext) for ext in video_exts):
-                    video_files.append(os.path.join(folder, file))
-        except PermissionError:
-            QMessageBox.warning(self, "Permission Error",
-                              "Cannot access the selected folder. Please check permissions.")
+    def add_dropped_files(self, paths):
+        if self.processing:
             return
+        if self.current_folder is None:
+            folders = [path for path in paths if os.path.isdir(path)]
+            self.current_folder = folders[0] if folders else os.path.dirname(paths[0])
+            self.input_folder_label.setText(self.current_folder)
+            self.input_folder_label.setStyleSheet("color: #28a745; font-weight: bold;")
+        self.start_scan(paths)
+
+    def start_scan(self, paths):
+        self.stop_scan()
+
+        self.stop_scan_btn.setVisible(True)
+        self.status_bar.showMessage("Scanning for videos...")
+
+        scanner = FolderScanner(paths)
+        self.scanner_thread = scanner
+
+        # Signals a replaced scan queued before it stopped are dropped on arrival
+        def current(slot):
+            return lambda *args: slot(*args) if scanner is self.scanner_thread else None
+
+        scanner.pairs_found.connect(current(self.add_scanned_pairs))
+        scanner.subtitles_resolved.connect(current(self.apply_resolved_subtitles))
+        scanner.scan_error.connect(current(self.status_bar.showMessage))
+        scanner.scan_finished.connect(current(self.scan_finished))
+        scanner.start()
+
+    def stop_scan(self):
+        if self.scanner_thread and self.scanner_thread.isRunning():
+            self.scanner_thread.stop()
+            self.scanner_thread.wait()
+
+    def add_scanned_pairs(self, pairs):
+        if self.files_model.add_pairs(pairs):
+            self.toggle_selection_btn.setEnabled(True)
+            self.status_bar.showMessage(f"Scanning... {self.files_model.rowCount()} video files found")
+
+    def apply_resolved_subtitles(self, resolved):
+        for job in self.files_model.jobs:
+            if job['video_path'] in resolved and not job['subtitle_path']:
+                self.files_model.set_subtitle(job['id'], resolved[job['video_path']])
+
+    def scan_finished(self, video_count, cancelled):
+        self.stop_scan_btn.setVisible(False)
+        total = self.files_model.rowCount()
+
+        if cancelled:
+            self.status_bar.showMessage(f"Scan stopped - loaded {total} video files")
+        else:
+            self.status_bar.showMessage(f"Loaded {total} video files")
 
-        video_files.sort()
-
-        subtitle_exts = [".srt", ".vtt", ".ass", ".ssa"]
-        subtitle_files = []
-        for file in os.listdir(folder):
-            if any(file.lower().endswith(ext) for ext in subtitle_exts):
-                subtitle_files.append(os.path.join(folder, file))
-
-        self.files_table.setRowCount(len(video_files))
-
-        for row, video_path in enumerate(video_files):
-            video_name = os.path.basename(video_path)
-
-            # Checkbox with proper styling
-            checkbox = QCheckBox()
-            checkbox.stateChanged.connect(self.update_ui_state)
-            self.files_table.setCellWidget(row, 0, checkbox)
-
-            video_item = QTableWidgetItem(video_name)
-            video_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-            video_item.setData(Qt.ItemDataRole.UserRole, video_path)
-            video_item.setToolTip(video_path)
-            self.files_table.setItem(row, 1, video_item)
-
-            subtitle_path = self.find_matching_subtitle(video_path, subtitle_files)
-            if subtitle_path:
-                subtitle_item = QTableWidgetItem(os.path.basename(subtitle_path))
-                subtitle_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                subtitle_item.setData(Qt.ItemDataRole.UserRole, subtitle_path)
-                subtitle_item.setToolTip(subtitle_path)
-                subtitle_item.setBackground(QColor(40, 167, 69, 50))
-                checkbox.setChecked(True)
-                status_item = QTableWidgetItem("Ready")
-                status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                status_item.setBackground(QColor(40, 167, 69, 50))
-            else:
-                # Show browse link instead of button
-                browse_btn = QPushButton("Browse")
-                browse_btn.setIcon(qta.icon('fa5s.folder-open', color='#007bff'))
-                browse_btn.setStyleSheet("QPushButton { border: none; background: transparent; color: #007bff; text-decoration: underline; }")
-                browse_btn.clicked.connect(lambda checked, r=row: self.browse_subtitle(r))
-                self.files_table.setCellWidget(row, 2, browse_btn)
-
-                status_item = QTableWidgetItem("No subtitle")
-                status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                status_item.setBackground(QColor(220, 53, 69, 50))
-
-            if subtitle_path:
-                self.files_table.setItem(row, 2, subtitle_item)
-
-            self.files_table.setItem(row, 3, status_item)
-
-            self.video_pairs.append({
-                'video_path': video_path,
-                'subtitle_path': subtitle_path
-            })
-
-        self.toggle_selection_btn.setEnabled(len(video_files) > 0)
-        self.update_ui_state()
-        self.status_bar.showMessage(f"Loaded {len(video_files)} video files")
-
-        if not video_files:
+        if not total and not cancelled:
             QMessageBox.information(self, "No Videos Found",
                                   "No supported video files found in the selected folder.\n"
                                   "Supported formats: MP4, MKV, MOV, AVI, WMV, FLV, WebM")
 
-    def find_matching_subtitle(self, video_path, subtitle_files):
-        video_name = os.path.splitext(os.path.basename(video_path))[0]
-        best_match = None
-        best_score = 0
+    def on_table_clicked(self, index):
+        if index.column() == FileTableModel.SUBTITLE_COLUMN and not index.data(Qt.ItemDataRole.UserRole):
+            if not self.processing:
+                self.browse_subtitle(index.row())
 
-        for subtitle_path in subtitle_files:
-            subtitle_name = os.path.splitext(os.path.basename(subtitle_path))[0]
-            similarity = difflib.SequenceMatcher(None,
-                                               video_name.lower(),
-                                               subtitle_name.lower()).ratio()
-            if similarity > best_score and similarity > 0.4:
-                best_score = similarity
-                best_match = subtitle_path
-
-        return best_match
+    def on_files_changed(self, top_left, bottom_right, roles=()):
+        # Status updates don't change the selection counts
+        if top_left.column() <= FileTableModel.SUBTITLE_COLUMN:
+            self.update_ui_state()
 
     def browse_subtitle(self, row):
-        video_path = self.files_table.item(row, 1).data(Qt.ItemDataRole.UserRole)
+        job = self.files_model.job(row)
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Select Subtitle File",
-            os.path.dirname(video_path),
+            os.path.dirname(job['video_path']),
             "Subtitle Files (*.srt *.vtt *.ass *.ssa);;All Files (*)"
         )
         if file_path:
-            subtitle_item = QTableWidgetItem(os.path.basename(file_path))
-            subtitle_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-            subtitle_item.setData(Qt.ItemDataRole.UserRole, file_path)
-            subtitle_item.setToolTip(file_path)
-            subtitle_item.setBackground(QColor(40, 167, 69, 50))
-            self.files_table.setItem(row, 2, subtitle_item)
-
-            status_item = QTableWidgetItem("Ready")
-            status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-            status_item.setBackground(QColor(40, 167, 69, 50))
-            self.files_table.setItem(row, 3, status_item)
-
-            checkbox = self.files_table.cellWidget(row, 0)
-            checkbox.setChecked(True)
-
-            self.video_pairs[row]['subtitle_path'] = file_path
+            self.files_model.set_subtitle(job['id'], file_path)
 
     def toggle_all_selection(self):
-        checked_count = 0
-        total_available = 0
-
-        for row in range(self.files_table.rowCount()):
-            subtitle_item = self.files_table.item(row, 2)
-            if subtitle_item and subtitle_item.data(Qt.ItemDataRole.UserRole):
-                total_available += 1
-                checkbox = self.files_table.cellWidget(row, 0)
-                if checkbox.isChecked():
-                    checked_count += 1
-
-        check_state = checked_count < total_available
-
-        for row in range(self.files_table.rowCount()):
-            subtitle_item = self.files_table.item(row, 2)
-            if subtitle_item and subtitle_item.data(Qt.ItemDataRole.UserRole):
-                checkbox = self.files_table.cellWidget(row, 0)
-                checkbox.setChecked(check_state)
+        checked_count, total_available = self.files_model.selection_counts()
+        self.files_model.set_all_checked(checked_count < total_available)
 
     def select_output_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Output Folder")
@@ -1559,16 +1629,8 @@ class HardSubberGUI(QMainWindow):
             self.output_folder_label.setStyleSheet("color: #6c757d; font-style: italic;")
 
     def update_ui_state(self):
-        enabled_count = 0
-        total_available = 0
-
-        for row in range(self.files_table.rowCount()):
-            subtitle_item = self.files_table.item(row, 2)
-            if subtitle_item and subtitle_item.data(Qt.ItemDataRole.UserRole):
-                total_available += 1
-                checkbox = self.files_table.cellWidget(row, 0)
-                if checkbox and checkbox.isChecked():
-                    enabled_count += 1
+        enabled_count, total_available = self.files_model.selection_counts()
+        self.toggle_selection_btn.setEnabled(total_available > 0)
 
         self.start_btn.setEnabled(enabled_count > 0 and not self.processing)
 
@@ -1584,42 +1646,153 @@ class HardSubberGUI(QMainWindow):
                 self.toggle_selection_btn.setText(f"Select All ({total_available} available)")
 
     def start_processing(self):
-        enabled_pairs = []
-        for row in range(self.files_table.rowCount()):
-            checkbox = self.files_table.cellWidget(row, 0)
-            if checkbox and checkbox.isChecked():
-                video_path = self.files_table.item(row, 1).data(Qt.ItemDataRole.UserRole)
-                subtitle_path = self.files_table.item(row, 2).data(Qt.ItemDataRole.UserRole)
-                if subtitle_path:
-                    enabled_pairs.append((video_path, subtitle_path))
-                    status_item = QTableWidgetItem("Queued")
-                    status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                    status_item.setBackground(QColor(0, 123, 255, 50))
-                    self.files_table.setItem(row, 3, status_item)
+        enabled_pairs = [
+            (job['id'], job['video_path'], job['subtitle_path']) for job in self.files_model.checked_jobs()
+        ]
+        self.files_model.set_statuses({job_id: ("Queued", 'active') for job_id, _, _ in enabled_pairs})
 
         if not enabled_pairs:
             QMessageBox.warning(self, "No Videos Selected",
                               "Please select at least one video-subtitle pair to process.")
             return
 
+        self.open_journal([(job_id, video, subtitle, 'queued') for job_id, video, subtitle in enabled_pairs])
+        self.run_batch(enabled_pairs)
+
+    def run_batch(self, enabled_pairs):
+        pinned = [job['id'] for job in self.files_model.jobs if job['pinned']]
         self.processing = True
         self.start_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
         self.skip_btn.setEnabled(True)
+        self.jobs_spin.setEnabled(False)
         self.files_table.setEnabled(False)
-        self.files_table.setStyleSheet(self.files_table.styleSheet() + "QTableWidget { opacity: 0.6; }")
+        self.files_table.setStyleSheet(self.files_table.styleSheet() + "QTableView { opacity: 0.6; }")
         self.progress_bar.setValue(0)
         self.save_settings()
 
         self.processor_thread = VideoProcessor(
-            enabled_pairs, self.output_folder, self.speed_combo.currentText(), self.subtitle_settings
+            enabled_pairs, self.output_folder, self.speed_combo.currentText(), self.subtitle_settings,
+            max_workers=self.jobs_spin.value(), journal=self.journal, output_cache=self.open_output_cache(),
+            pinned=pinned
         )
-        self.processor_thread.progress_updated.connect(self.update_progress)
+        self.processor_thread.progress_snapshot.connect(self.apply_progress_snapshot)
         self.processor_thread.video_completed.connect(self.video_completed)
         self.processor_thread.all_completed.connect(self.processing_completed)
         self.processor_thread.error_occurred.connect(self.handle_error)
         self.processor_thread.start()
 
+    def batch_settings(self):
+        return {
+            'input_folder': self.current_folder,
+            'output_folder': self.output_folder,
+            'speed_preset': self.speed_combo.currentText(),
+            'parallel_jobs': self.jobs_spin.value(),
+            'subtitle_settings': self.subtitle_settings,
+            'pinned_videos': [job['video_path'] for job in self.files_model.jobs if job['pinned']],
+        }
+
+    def open_journal(self, jobs):
+        """Start a journal for this batch next to its outputs"""
+        self.close_journal()
+        folder = self.output_folder or self.current_folder
+        if not folder:
+            return
+        try:
+            self.journal = JobJournal.for_folder(folder)
+            self.journal.start_batch(jobs, self.batch_settings())
+            self.settings.setValue("journal_path", self.journal.path)
+        except (sqlite3.Error, OSError) as e:
+            self.journal = None
+            self.status_bar.showMessage(f"Job journal unavailable, batch cannot be resumed: {e}")
+
+    def open_output_cache(self):
+        """The shared output cache, opened once and reused by every batch"""
+        if not self.subtitle_settings.get('output_cache_enabled', True):
+            return None
+        if not self.output_cache:
+            try:
+                self.output_cache = OutputCache()
+            except (sqlite3.Error, OSError) as e:
+                self.status_bar.showMessage(f"Output cache unavailable: {e}")
+        return self.output_cache
+
+    def close_output_cache(self):
+        if self.output_cache:
+            self.output_cache.close()
+            self.output_cache = None
+
+    def close_journal(self, remove=False):
+        if not self.journal:
+            return
+        if remove:
+            self.journal.remove()
+            self.settings.remove("journal_path")
+        else:
+            self.journal.close()
+        self.journal = None
+
+    def offer_resume(self):
+        """Offer to pick up a batch the journal says never finished"""
+        path = self.settings.value("journal_path", "", type=str)
+        if not path:
+            return
+        try:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            journal = JobJournal(path)
+            jobs = journal.jobs()
+            batch = journal.settings()
+        except (sqlite3.Error, OSError):
+            self.settings.remove("journal_path")
+            return
+
+        pending = [job for job in jobs if job['state'] not in JobJournal.FINAL_STATES]
+        if pending:
+            reply = QMessageBox.question(self, "Resume Batch",
+                                       f"A previous batch stopped with {len(pending)} of {len(jobs)} "
+                                       "videos unfinished.\nResume it now?",
+                                       QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                       QMessageBox.StandardButton.Yes)
+        if not pending or reply != QMessageBox.StandardButton.Yes:
+            journal.remove()
+            self.settings.remove("journal_path")
+            return
+
+        journal.discard_partial_outputs()
+
+        self.current_folder = batch.get('input_folder')
+        if self.current_folder:
+            self.input_folder_label.setText(self.current_folder)
+            self.input_folder_label.setStyleSheet("color: #28a745; font-weight: bold;")
+        self.output_folder = batch.get('output_folder')
+        if self.output_folder:
+            self.output_folder_label.setText(self.output_folder)
+            self.output_folder_label.setStyleSheet("color: #28a745; font-weight: bold;")
+        if batch.get('speed_preset'):
+            self.speed_combo.setCurrentText(batch['speed_preset'])
+        self.jobs_spin.setValue(batch.get('parallel_jobs', 1))
+        self.subtitle_settings = batch.get('subtitle_settings') or {}
+
+        # Rows get fresh ids, so the journal is rewritten under them
+        self.files_model.clear()
+        self.files_model.add_pairs([(job['video_path'], job['subtitle_path']) for job in jobs])
+        ids = {row['video_path']: row['id'] for row in self.files_model.jobs}
+        self.files_model.pin_jobs([ids[path] for path in batch.get('pinned_videos', []) if path in ids])
+        journal.start_batch(
+            [(ids[job['video_path']], job['video_path'], job['subtitle_path'],
+              job['state'] if job['state'] in JobJournal.FINAL_STATES else 'queued') for job in jobs],
+            batch
+        )
+        self.files_model.set_statuses({
+            ids[job['video_path']]: ("Completed", 'done') if job['state'] == 'done' else ("Skipped", 'failed')
+            for job in jobs if job['state'] in JobJournal.FINAL_STATES
+        })
+        self.files_model.set_statuses({ids[job['video_path']]: ("Queued", 'active') for job in pending})
+
+        self.journal = journal
+        self.run_batch([(ids[job['video_path']], job['video_path'], job['subtitle_path']) for job in pending])
+
     def handle_error(self, video_name, error_message):
         self.status_bar.showMessage(f"Error processing {video_name}: {error_message}")
 
@@ -1635,10 +1808,20 @@ class HardSubberGUI(QMainWindow):
             self.cancel_btn.setEnabled(False)
             self.status_bar.showMessage("Cancelling processing...")
 
-    def update_progress(self, percent, video_name, output_size, input_size, original_video_size, eta):
-        self.progress_bar.setValue(percent)
-        self.current_video_label.setText(f"Processing: {video_name}")
+    def apply_progress_snapshot(self, snapshot):
+        jobs = snapshot['jobs']
+        active = snapshot['active']
+        self.progress_bar.setValue(int(snapshot['overall']))
 
+        if len(active) == 1:
+            self.current_video_label.setText(f"Processing: {active[0]}")
+        elif active:
+            self.current_video_label.setText(f"Processing {len(active)} videos: {', '.join(active[:3])}"
+                                             + (", ..." if len(active) > 3 else ""))
+
+        output_size = sum(state['output_size'] for state in jobs.values())
+        input_size = sum(state['input_size'] for state in jobs.values())
+        original_video_size = sum(state['video_size'] for state in jobs.values())
         if input_size > 0:
             size_ratio = (output_size / input_size) * 100
             size_change = f"+{output_size - original_video_size:.1f}MB" if output_size > original_video_size else f"-{original_video_size - output_size:.1f}MB"
@@ -1648,6 +1831,7 @@ class HardSubberGUI(QMainWindow):
                 f"Original: {original_video_size:.1f}MB | Change: {size_change}"
             )
 
+        eta = snapshot['eta']
         if eta > 0:
             eta_hours = int(eta // 3600)
             eta_minutes = int((eta % 3600) // 60)
@@ -1660,46 +1844,31 @@ class HardSubberGUI(QMainWindow):
                 eta_text = f"ETA: {eta_seconds}s"
             self.eta_label.setText(eta_text)
 
-        for row in range(self.files_table.rowCount()):
-            video_item = self.files_table.item(row, 1)
-            if video_item and os.path.basename(video_item.data(Qt.ItemDataRole.UserRole)) == video_name:
-                status_item = QTableWidgetItem(f"Processing ({percent}%)")
-                status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                status_item.setBackground(QColor(0, 123, 255, 50))
-                self.files_table.setItem(row, 3, status_item)
-                break
+        self.files_model.set_statuses({
+            job_id: (f"Processing ({state['percent']}%)", 'active') for job_id, state in jobs.items()
+        })
 
-    def video_completed(self, video_name, success, output_path):
+    def video_completed(self, job_id, video_name, success, output_path):
         status = "Completed" if success else "Failed/Skipped"
         self.current_video_label.setText(f"{status}: {video_name}")
 
-        for row in range(self.files_table.rowCount()):
-            video_item = self.files_table.item(row, 1)
-            if video_item and os.path.basename(video_item.data(Qt.ItemDataRole.UserRole)) == video_name:
-                if success:
-                    status_item = QTableWidgetItem("Completed")
-                    status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                    status_item.setBackground(QColor(40, 167, 69, 50))
-                    status_item.setToolTip(f"Output: {output_path}")
-                else:
-                    status_item = QTableWidgetItem("Failed")
-                    status_item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                    status_item.setBackground(QColor(220, 53, 69, 50))
-                self.files_table.setItem(row, 3, status_item)
-                break
-
         if success:
+            self.files_model.set_status(job_id, "Completed", 'done', f"Output: {output_path}")
             self.status_bar.showMessage(f"Completed: {video_name}")
+        else:
+            self.files_model.set_status(job_id, "Failed", 'failed')
 
     def processing_completed(self, success_count, total_count):
         self.processing = False
         self.start_btn.setEnabled(True)
         self.cancel_btn.setEnabled(False)
         self.skip_btn.setEnabled(False)
+        self.jobs_spin.setEnabled(True)
         self.files_table.setEnabled(True)
-        self.files_table.setStyleSheet(self.files_table.styleSheet().replace("QTableWidget { opacity: 0.6; }", ""))
+        self.files_table.setStyleSheet(self.files_table.styleSheet().replace("QTableView { opacity: 0.6; }", ""))
         self.progress_bar.setValue(100)
         self.current_video_label.setText(f"Processing completed! {success_count}/{total_count} successful")
+        self.close_journal(remove=True)
         self.eta_label.setText("")
         self.status_bar.showMessage(f"All processing completed: {success_count}/{total_count} successful")
         self.update_ui_state()
@@ -1758,6 +1927,7 @@ class HardSubberGUI(QMainWindow):
     
 
     def closeEvent(self, event):
+        self.stop_scan()
         if self.processor_thread and self.processor_thread.isRunning():
             reply = QMessageBox.question(self, 'Confirm Exit',
                                        'Processing is still running. Are you sure you want to exit?',
@@ -1766,11 +1936,15 @@ class HardSubberGUI(QMainWindow):
             if reply == QMessageBox.StandardButton.Yes:
                 self.processor_thread.stop()
                 self.processor_thread.wait()
+                self.close_journal()
+                self.close_output_cache()
                 event.accept()
             else:
                 event.ignore()
         else:
             self.save_settings()
+            self.close_journal()
+            self.close_output_cache()
             event.accept()
 
 def main():
@@ -1782,6 +1956,7 @@ def main():
 
     window = HardSubberGUI()
     window.show()
+    trace_startup("window shown")
 
     sys.exit(app.exec())
 
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+# ╔════════════════════════════╗
+# ║  HardSubber Automator v4.3 ║
+# ║  Encode Cluster            ║
+# ║  by Nexus // MD-nexus      ║
+# ╚════════════════════════════╝
+#
+# One coordinator owns a manifest's queue; workers on any host that sees the
+# same files lease jobs from it over TCP and encode them with the V4 engine.
+#     python hardsubber_cluster.py coordinator batch.toml --port 8765
+#     python hardsubber_cluster.py worker nas-host:8765 -j 2
+#
+# Protocol: one JSON object per line, every worker message gets one reply.
+#   hello    {worker, token}            -> welcome {worker, batch, lease_ttl} | error
+#   lease    {}                         -> job {job_id, video, subtitle, lease} | wait {retry} | done
+#   progress {lease, percent, eta}      -> ok | lost     (percent is null for heartbeats)
+#   state    {lease, state, output_path, detail}  (engine journal writes) -> ok | lost
+# Any message about a lease renews it; "lost" means it expired and the job
+# went back to the queue, so the worker must stop encoding it.
+
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import socket
+import shutil
+import sqlite3
+import tomllib
+import argparse
+import ipaddress
+import threading
+import socketserver
+from collections import deque
+
+from hardsubber_engine import EncodeEngine, OutputCache, load_manifest, open_batch_journal, format_eta
+
+DEFAULT_PORT = 8765
+DEFAULT_LEASE_TTL = 60
+WAIT_RETRY = 2.0
+
+
+# ---COORDINATOR--- #
+class Coordinator:
+    """The batch queue: hands out leases, takes progress and results, re-queues expired leases.
+
+    A lease lasts lease_ttl seconds from the worker's last message about it.
+    A job whose lease ran out max_attempts times is failed instead of
+    re-queued, so one video that kills every worker can't stall the batch.
+    """
+    FINAL_STATES = ('done', 'failed', 'skipped')
+
+    def __init__(self, jobs, batch, journal=None, lease_ttl=DEFAULT_LEASE_TTL, max_attempts=3, token=None,
+                 on_event=None):
+        self.batch = batch
+        self.journal = journal
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.token = token
+        self.on_event = on_event or (lambda message: None)
+
+        self.jobs = {
+            job_id: {'job_id': job_id, 'video': video_path, 'subtitle': subtitle_path, 'state': 'queued',
+                     'lease': None, 'worker': None, 'deadline': 0.0, 'attempts': 0, 'percent': 0.0,
+                     'output_path': None}
+            for job_id, video_path, subtitle_path in jobs
+        }
+        self.queue = deque(self.jobs)
+        self.leases = {}    # lease token -> job id
+        self.workers = 0
+        self.next_worker = 0
+        self.lock = threading.Lock()
+
+    def record_state(self, job_id, state, output_path=None, detail=None):
+        if not self.journal:
+            return
+        try:
+            self.journal.set_state(job_id, state, output_path, detail)
+        except sqlite3.Error as e:
+            self.on_event(f"Job journal write failed: {e}")
+
+    def finished(self):
+        with self.lock:
+            return all(job['state'] in self.FINAL_STATES for job in self.jobs.values())
+
+    def counts(self):
+        """(successful jobs, total jobs)"""
+        with self.lock:
+            return sum(1 for job in self.jobs.values() if job['state'] == 'done'), len(self.jobs)
+
+    def progress(self):
+        """(overall percent, [(worker, video name, percent)] of leased jobs)"""
+        with self.lock:
+            done = sum(1 for job in self.jobs.values() if job['state'] in self.FINAL_STATES)
+            leased = [job for job in self.jobs.values() if job['lease']]
+            overall = (done + sum(job['percent'] for job in leased) / 100) / max(1, len(self.jobs)) * 100
+            return overall, [(job['worker'], os.path.basename(job['video']), job['percent']) for job in leased]
+
+    def handle(self, worker, message):
+        """Reply to one worker message; worker is None until its hello is accepted"""
+        kind = message.get('type')
+        if kind == 'hello':
+            if worker is not None:
+                return {'type': 'error', 'message': f"already connected as {worker}"}
+            return self.hello(message)
+        if worker is None:
+            return {'type': 'error', 'message': "say hello first"}
+        if kind == 'lease':
+            return self.lease(worker)
+        if kind in ('progress', 'state'):
+            return self.update(worker, message)
+        return {'type': 'error', 'message': f"unknown message type {kind!r}"}
+
+    def hello(self, message):
+        given = str(message.get('token') or '').encode('utf-8')
+        if self.token and not hmac.compare_digest(given, self.token.encode('utf-8')):
+            return {'type': 'error', 'message': "wrong cluster token"}
+        with self.lock:
+            self.next_worker += 1
+            self.workers += 1
+            worker = f"{message.get('worker') or 'worker'}#{self.next_worker}"
+        self.on_event(f"{worker} connected")
+        return {'type': 'welcome', 'worker': worker, 'batch': self.batch, 'lease_ttl': self.lease_ttl}
+
+    def lease(self, worker):
+        with self.lock:
+            if not self.queue:
+                if any(job['lease'] for job in self.jobs.values()):
+                    # Leased jobs may still come back if their worker dies
+                    return {'type': 'wait', 'retry': WAIT_RETRY}
+                return {'type': 'done'}
+            job = self.jobs[self.queue.popleft()]
+            job.update(state='leased', lease=uuid.uuid4().hex, worker=worker, percent=0.0,
+                       deadline=time.monotonic() + self.lease_ttl)
+            self.leases[job['lease']] = job['job_id']
+        self.record_state(job['job_id'], 'running', detail=f"Leased by {worker}")
+        self.on_event(f"{worker} took {os.path.basename(job['video'])}")
+        return {'type': 'job', 'job_id': job['job_id'], 'video': job['video'], 'subtitle': job['subtitle'],
+                'lease': job['lease']}
+
+    def update(self, worker, message):
+        """Progress or an engine journal write for a leased job"""
+        with self.lock:
+            job = self.jobs.get(self.leases.get(message.get('lease')))
+            if not job or job['worker'] != worker:
+                return {'type': 'lost'}
+            job['deadline'] = time.monotonic() + self.lease_ttl
+            if message['type'] == 'progress':
+                # Heartbeats carry no percent
+                if message.get('percent') is not None:
+                    job['percent'] = float(message['percent'])
+                return {'type': 'ok'}
+
+            state = message.get('state')
+            job['output_path'] = message.get('output_path') or job['output_path']
+            if state in self.FINAL_STATES:
+                del self.leases[job['lease']]
+                job.update(state=state, lease=None, percent=0.0)
+            elif state == 'interrupted':
+                # The worker is shutting down; the next one starts the job over
+                del self.leases[job['lease']]
+                job.update(state='queued', lease=None, percent=0.0)
+                self.queue.appendleft(job['job_id'])
+
+        self.record_state(job['job_id'], state, message.get('output_path'), message.get('detail'))
+        if state in self.FINAL_STATES:
+            outcome = {'done': "finished", 'failed': "failed", 'skipped': "skipped"}[state]
+            detail = f": {message['detail']}" if state == 'failed' and message.get('detail') else ""
+            self.on_event(f"{worker} {outcome} {os.path.basename(job['video'])}{detail}")
+        elif state == 'interrupted':
+            self.on_event(f"{os.path.basename(job['video'])} re-queued: {worker} stopped")
+        return {'type': 'ok'}
+
+    def expire(self, job, reason):
+        """Take a lease back; call with the lock held. Returns the event message"""
+        del self.leases[job['lease']]
+        job.update(lease=None, percent=0.0, attempts=job['attempts'] + 1)
+        if job['attempts'] >= self.max_attempts:
+            job['state'] = 'failed'
+            return (job['job_id'], 'failed', f"{reason}; gave up after {job['attempts']} attempts",
+                    f"{os.path.basename(job['video'])} failed after {job['attempts']} lost leases ({reason})")
+        job['state'] = 'queued'
+        # Back to the front, so a retried job isn't left for the very end
+        self.queue.appendleft(job['job_id'])
+        return (job['job_id'], 'queued', reason, f"{os.path.basename(job['video'])} re-queued: {reason}")
+
+    def reap(self):
+        """Re-queue every job whose lease ran out"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [self.expire(job, f"lease expired on {job['worker']}")
+                       for job in self.jobs.values() if job['lease'] and job['deadline'] < now]
+        for job_id, state, detail, event in expired:
+            self.record_state(job_id, state, detail=detail)
+            self.on_event(event)
+
+    def disconnect(self, worker):
+        """A worker's connection closed: its leases go back to the queue right away"""
+        with self.lock:
+            self.workers -= 1
+            released = [self.expire(job, f"{worker} disconnected")
+                        for job in self.jobs.values() if job['lease'] and job['worker'] == worker]
+        for job_id, state, detail, event in released:
+            self.record_state(job_id, state, detail=detail)
+            self.on_event(event)
+        self.on_event(f"{worker} disconnected")
+
+    def interrupt(self):
+        """Coordinator shutdown: leased jobs are left for a resumed batch to redo"""
+        with self.lock:
+            leased = [(job['job_id'], job['output_path']) for job in self.jobs.values() if job['lease']]
+        for job_id, output_path in leased:
+            self.record_state(job_id, 'interrupted', output_path)
+
+
+class WorkerConnection(socketserver.StreamRequestHandler):
+    """One worker's connection: read a JSON line, answer it, repeat"""
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker = None
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    reply = {'type': 'error', 'message': f"invalid message: {e}"}
+                else:
+                    reply = coordinator.handle(worker, message)
+                    if reply['type'] == 'welcome':
+                        worker = reply['worker']
+                self.wfile.write((json.dumps(reply) + "\n").encode('utf-8'))
+        except OSError:
+            pass
+        finally:
+            if worker:
+                coordinator.disconnect(worker)
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, coordinator):
+        super().__init__(address, WorkerConnection)
+        self.coordinator = coordinator
+
+
+# ---WORKER--- #
+class CoordinatorClient:
+    """Request/reply over one connection; shared by the lease loop, the engine callbacks and the heartbeat"""
+
+    def __init__(self, host, port, timeout=30):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.stream = self.sock.makefile('rwb')
+        self.lock = threading.Lock()
+
+    def request(self, message):
+        with self.lock:
+            self.stream.write((json.dumps(message) + "\n").encode('utf-8'))
+            self.stream.flush()
+            line = self.stream.readline()
+        if not line:
+            raise ConnectionError("coordinator closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.stream.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RemoteJournal:
+    """Stands in for EncodeEngine's JobJournal and forwards its state writes to the coordinator"""
+
+    def __init__(self, client, lease, on_lost):
+        self.client = client
+        self.lease = lease
+        self.on_lost = on_lost
+
+    def set_state(self, job_id, state, output_path=None, detail=None):
+        try:
+            reply = self.client.request({'type': 'state', 'lease': self.lease, 'state': state,
+                                         'output_path': output_path, 'detail': detail})
+        except (OSError, ValueError):
+            reply = {'type': 'lost'}
+        if reply.get('type') == 'lost':
+            self.on_lost()
+
+
+class ClusterWorker:
+    """Leases jobs from a coordinator and encodes them one at a time with an EncodeEngine"""
+
+    def __init__(self, host, port, name, max_workers=1, token=None, quiet=False):
+        self.host = host
+        self.port = port
+        self.name = name
+        self.max_workers = max_workers
+        self.token = token
+        self.quiet = quiet
+        self.client = None
+        self.engine = None
+        self.stopping = False
+
+    def stop(self):
+        """Stop the running encode; its interrupted state sends the job back to the queue"""
+        self.stopping = True
+        if self.engine:
+            self.engine.stop()
+
+    def run(self):
+        """Lease and encode jobs until the coordinator says the batch is done; returns an exit code"""
+        try:
+            self.client = CoordinatorClient(self.host, self.port)
+            welcome = self.client.request({'type': 'hello', 'worker': self.name, 'token': self.token})
+        except (OSError, ValueError) as e:
+            print(f"Cannot reach coordinator {self.host}:{self.port}: {e}", file=sys.stderr)
+            return 2
+        if welcome.get('type') != 'welcome':
+            print(f"Coordinator refused {self.name}: {welcome.get('message')}", file=sys.stderr)
+            self.client.close()
+            return 2
+
+        batch = welcome['batch']
+        output_cache = OutputCache() if batch.get('cache') else None
+        print(f"Connected to {self.host}:{self.port} as {welcome['worker']}", flush=True)
+        try:
+            while not self.stopping:
+                reply = self.client.request({'type': 'lease'})
+                if reply['type'] == 'done':
+                    print("Batch finished", flush=True)
+                    return 0
+                if reply['type'] == 'wait':
+                    time.sleep(reply.get('retry', WAIT_RETRY))
+                    continue
+                if reply['type'] != 'job':
+                    print(f"Coordinator error: {reply.get('message')}", file=sys.stderr)
+                    return 1
+                self.run_job(reply, batch, welcome['lease_ttl'], output_cache)
+            return 130
+        except (OSError, ValueError) as e:
+            print(f"Lost the coordinator: {e}", file=sys.stderr)
+            return 1
+        finally:
+            self.client.close()
+            if output_cache:
+                output_cache.close()
+
+    def run_job(self, job, batch, lease_ttl, output_cache):
+        """Encode one leased job, keeping the lease alive until the engine is done"""
+        lost = threading.Event()
+        finished = threading.Event()
+
+        def on_lost():
+            if not lost.is_set():
+                lost.set()
+                print(f"Lease on {os.path.basename(job['video'])} lost, stopping it", file=sys.stderr, flush=True)
+            self.engine.stop()
+
+        def send_progress(percent=None, eta=None):
+            try:
+                reply = self.client.request({'type': 'progress', 'lease': job['lease'], 'percent': percent,
+                                             'eta': eta})
+            except (OSError, ValueError):
+                reply = {'type': 'lost'}
+            if reply.get('type') == 'lost':
+                on_lost()
+
+        def on_progress(snapshot):
+            state = snapshot['jobs'].get(job['job_id'])
+            if state:
+                send_progress(state['percent'], snapshot['eta'])
+                if not self.quiet:
+                    print(f"[{state['percent']:3d}%] ETA {format_eta(snapshot['eta'])} | {state['video_name']}",
+                          flush=True)
+
+        def on_error(video_name, message):
+            print(f"Failed: {video_name}: {message}", file=sys.stderr, flush=True)
+
+        # Probing and hashing report no progress, so a heartbeat keeps the lease meanwhile
+        def heartbeat():
+            while not finished.wait(lease_ttl / 3):
+                send_progress()
+
+        self.engine = EncodeEngine(
+            [(job['job_id'], job['video'], job['subtitle'])], batch['output_folder'], batch['speed_preset'],
+            batch['settings'], max_workers=self.max_workers, journal=RemoteJournal(self.client, job['lease'], on_lost),
+            output_cache=output_cache, on_progress=on_progress, on_error=on_error
+        )
+        if self.stopping:
+            self.engine.stop()
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            self.engine.run()
+        finally:
+            finished.set()
+
+
+# ---COMMAND LINE--- #
+def parse_address(value):
+    host, sep, port = value.rpartition(":")
+    if not sep:
+        return value, DEFAULT_PORT
+    return host.strip("[]"), int(port)
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def run_coordinator(args):
+    if not args.token and not is_loopback(args.host):
+        print(f"Listening on {args.host} needs --token (or $HARDSUBBER_CLUSTER_TOKEN)", file=sys.stderr)
+        return 2
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+        print(f"Invalid manifest {args.manifest}: {e}", file=sys.stderr)
+        return 2
+
+    jobs = manifest['jobs']
+    journal = None
+    try:
+        # Workers write into the output folder, and the journal lives in it
+        if manifest['output_folder']:
+            os.makedirs(manifest['output_folder'], exist_ok=True)
+        if manifest['journal']:
+            journal, jobs = open_batch_journal(manifest, args.resume)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cannot prepare the batch: {e}", file=sys.stderr)
+        return 2
+    if len(jobs) < len(manifest['jobs']):
+        print(f"Resuming: {len(manifest['jobs']) - len(jobs)} of {len(manifest['jobs'])} jobs already finished")
+
+    def on_event(message):
+        print(message, flush=True)
+
+    # Hand jobs out in the order a local batch would start them: pinned ones,
+    # then the largest first (jobs that can't be probed keep manifest order)
+    planner = EncodeEngine(jobs, manifest['output_folder'], manifest['speed_preset'], manifest['settings'],
+                           max_workers=len(jobs), pinned=manifest['pinned'])
+    planner.media_info = planner.probe_media(video_path for _, video_path, _ in jobs)
+    jobs = planner.schedule(jobs)
+
+    # Workers get everything they need to build their own engine
+    batch = {key: manifest[key] for key in ('output_folder', 'speed_preset', 'settings', 'cache')}
+    coordinator = Coordinator(jobs, batch, journal, lease_ttl=args.lease_ttl, max_attempts=args.max_attempts,
+                              token=args.token, on_event=on_event)
+    try:
+        server = CoordinatorServer((args.host, args.port), coordinator)
+    except OSError as e:
+        print(f"Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Coordinating {len(jobs)} jobs on {args.host}:{args.port}", flush=True)
+
+    last_percent = -1
+    try:
+        while not coordinator.finished():
+            time.sleep(min(1.0, args.lease_ttl / 3))
+            coordinator.reap()
+            percent, running = coordinator.progress()
+            if not args.quiet and running and int(percent) != last_percent:
+                last_percent = int(percent)
+                print(f"[{last_percent:3d}%] " + ", ".join(f"{worker}: {video} {int(job_percent)}%"
+                                                         for worker, video, job_percent in running), flush=True)
+        # Idle workers poll every few seconds; give them the chance to hear the batch is done
+        deadline = time.monotonic() + WAIT_RETRY * 2
+        while coordinator.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        print("\nStopping, interrupted jobs stay in the journal for --resume", file=sys.stderr)
+        coordinator.interrupt()
+        server.shutdown()
+        server.server_close()
+        if journal:
+            journal.close()
+        return 130
+
+    server.shutdown()
+    server.server_close()
+    success_count, total_count = coordinator.counts()
+    print(f"Finished: {success_count}/{total_count} successful")
+    if journal:
+        if success_count == total_count:
+            journal.remove()
+        else:
+            journal.close()
+    return 0 if success_count == total_count else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Share a HardSubber batch between encode nodes.")
+    parser.add_argument("--token", default=os.environ.get("HARDSUBBER_CLUSTER_TOKEN"),
+                        help="shared secret workers must present (default: $HARDSUBBER_CLUSTER_TOKEN)")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    coordinator = modes.add_parser("coordinator", help="own a manifest's queue and hand jobs to workers")
+    coordinator.add_argument("manifest", help="JSON or TOML file listing the jobs and encode settings")
+    coordinator.add_argument("--host", default="127.0.0.1",
+                             help="address to listen on, e.g. 0.0.0.0 for all (default: this machine only)")
+    coordinator.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL,
+                             help="seconds without word from a worker before its job is re-queued")
+    coordinator.add_argument("--max-attempts", type=int, default=3,
+                             help="lease expiries before a job is failed instead of re-queued")
+    coordinator.add_argument("--resume", action="store_true",
+                             help="skip jobs the batch journal lists as done and redo interrupted ones")
+    coordinator.add_argument("-q", "--quiet", action="store_true", help="only report job events")
+
+    worker = modes.add_parser("worker", help="encode jobs leased from a coordinator")
+    worker.add_argument("coordinator", help="HOST:PORT of the coordinator")
+    worker.add_argument("-j", "--jobs", type=int, default=1, help="parts a long video is split into in segment mode (each job gets every core)")
+    worker.add_argument("--name", default=socket.gethostname(), help="name shown by the coordinator")
+    worker.add_argument("-q", "--quiet", action="store_true", help="only report failures")
+    args = parser.parse_args(argv)
+
+    if args.mode == "coordinator":
+        return run_coordinator(args)
+
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        print("FFmpeg and FFprobe are required but not found in PATH.", file=sys.stderr)
+        return 2
+    host, port = parse_address(args.coordinator)
+    worker = ClusterWorker(host, port, args.name, max_workers=args.jobs, token=args.token, quiet=args.quiet)
+
+    # The worker runs on its own thread so Ctrl+C can stop ffmpeg and hand the job back
+    result = []
+    runner = threading.Thread(target=lambda: result.append(worker.run()))
+    runner.start()
+    try:
+        while runner.is_alive():
+            runner.join(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping, the coordinator will hand the job to another worker", file=sys.stderr)
+        worker.stop()
+        runner.join()
+        return 130
+    return result[0] if result else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2274 @@
+#!/usr/bin/env python3
+# ╔════════════════════════════╗
+# ║  HardSubber Automator v4.3 ║
+# ║  Headless Encode Engine    ║
+# ║  by Nexus // MD-nexus      ║
+# ╚════════════════════════════╝
+#
+# Everything V4 needs to encode a batch, without importing Qt.
+# Run it directly with a JSON or TOML manifest:
+#     python hardsubber_engine.py batch.toml
+
+import re
+import os
+import sys
+import html
+import json
+import mmap
+import errno
+import time
+import shutil
+import sqlite3
+import hashlib
+import tomllib
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# ---FFMPEG PROGRESS READER--- #
+@dataclass
+class FFmpegProgress:
+    """One block of ffmpeg `-progress` output"""
+    out_time: float = 0.0      # seconds of output written
+    total_size: int = 0        # bytes written to the output so far
+    fps: float = 0.0
+    speed: float = 0.0         # encode speed as a multiple of realtime
+    frame: int = 0
+    finished: bool = False     # True on the final `progress=end` block
+
+
+def read_ffmpeg_progress(stream):
+    """Yield an FFmpegProgress for every key=value block ffmpeg writes with -progress"""
+    values = {}
+    for line in stream:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        if key != "progress":
+            values[key] = value
+            continue
+
+        event = FFmpegProgress(finished=(value == "end"))
+        try:
+            # out_time_us is the exact field; older builds mislabel it as out_time_ms
+            event.out_time = int(values.get("out_time_us", values.get("out_time_ms", "0"))) / 1_000_000
+        except ValueError:
+            pass
+        try:
+            event.total_size = int(values.get("total_size", "0"))
+        except ValueError:
+            pass
+        try:
+            event.fps = float(values.get("fps", "0"))
+        except ValueError:
+            pass
+        try:
+            event.speed = float(values.get("speed", "0x").rstrip("x"))
+        except ValueError:
+            pass
+        try:
+            event.frame = int(values.get("frame", "0"))
+        except ValueError:
+            pass
+
+        values = {}
+        yield event
+
+
+# ---FFMPEG CAPABILITIES--- #
+def user_cache_dir():
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(r"~\AppData\Local")
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser("~/.cache")
+    return os.path.join(base, "HardSubber")
+
+
+def parse_ffmpeg_listing(output):
+    """Names from `ffmpeg -encoders` / `-filters` output, whose rows start with a flags column"""
+    names = []
+    for line in output.splitlines():
+        match = re.match(r"\s*[A-Z.|]{3,6}\s+(\S+)\s", line)
+        if match and match.group(1) != "=":
+            names.append(match.group(1))
+    return names
+
+
+def probe_ffmpeg(binary="ffmpeg", cache_path=None):
+    """Version, encoders and filters of the ffmpeg on PATH, or None if there is none.
+
+    Running ffmpeg three times costs more than a cold GUI start, so the result
+    is cached on disk, keyed by the binary's resolved path, size and mtime.
+    """
+    path = shutil.which(binary)
+    if not path:
+        return None
+    path = os.path.realpath(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    cache_path = cache_path or os.path.join(user_cache_dir(), "ffmpeg_capabilities.json")
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['capabilities']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    def run(*args):
+        return subprocess.run([path, "-hide_banner", *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              text=True, errors='replace', timeout=30).stdout
+
+    try:
+        capabilities = {
+            'path': path,
+            'version': run("-version").split('\n')[0],
+            'encoders': parse_ffmpeg_listing(run("-encoders")),
+            'filters': parse_ffmpeg_listing(run("-filters")),
+        }
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'capabilities': capabilities}, f)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+    return capabilities
+
+
+# ---SUBTITLE MATCHER--- #
+class SubtitleMatcher:
+    """Pairs videos with subtitles using a token index and a one-to-one assignment.
+
+    Each subtitle name is tokenized once. Candidates for a video come from the
+    episode-number index or its rarest tokens, so matching a folder stays close
+    to linear instead of scoring every video against every subtitle.
+    """
+
+    # Tokens that say nothing about which video a subtitle belongs to
+    NOISE_TOKENS = {
+        "sub", "subs", "subtitle", "subtitles", "en", "eng", "english", "forced", "sdh", "cc",
+        "x264", "x265", "h264", "h265", "hevc", "avc", "aac", "ac3", "web", "webrip", "webdl",
+        "dl", "bluray", "bdrip", "brrip", "hdtv", "dvdrip", "remux", "hd", "proper", "repack",
+    }
+    EPISODE_PATTERNS = [
+        re.compile(r"s(\d{1,2})\s*e(\d{1,4})"),                         # S01E02
+        re.compile(r"\b(\d{1,2})x(\d{2,3})\b"),                           # 1x02
+        re.compile(r"\b(?:e|ep|episode)\s*(\d{1,4})\b"),                  # E10, Ep 10, Episode10
+        re.compile(r"(?:^|\s)-\s*(\d{1,4})(?:v\d)?(?=\s*(?:-|\[|\(|$))"),  # Show - 10 - Title
+    ]
+    # Leftovers of episode markers (S01E02, 1x02, Ep 10, v2) that don't name a show
+    EPISODE_WORDS = {"s", "e", "ep", "episode", "x", "v"}
+    MAX_CANDIDATES = 64
+
+    def __init__(self, subtitle_paths, min_score=0.34):
+        self.subtitle_paths = list(subtitle_paths)
+        self.min_score = min_score
+        self.entries = [self.describe(path) for path in self.subtitle_paths]
+
+        self.token_index = {}
+        self.episode_index = {}
+        for sub_id, (tokens, episode) in enumerate(self.entries):
+            for token in tokens:
+                self.token_index.setdefault(token, []).append(sub_id)
+            if episode:
+                self.episode_index.setdefault(episode[1], []).append(sub_id)
+
+    def normalize(self, path):
+        name = os.path.splitext(os.path.basename(path))[0].lower()
+        return re.sub(r"[._]+", " ", name)
+
+    def tokenize(self, name):
+        tokens = re.findall(r"[a-z]+|\d+", name)
+        return {t for t in tokens if t not in self.NOISE_TOKENS and not re.fullmatch(r"\d{3,4}p", t)}
+
+    def episode_key(self, name):
+        """(season or None, episode) pulled from a normalized name, or None"""
+        for pattern in self.EPISODE_PATTERNS:
+            match = pattern.search(name)
+            if match:
+                groups = match.groups()
+                if len(groups) == 2:
+                    return int(groups[0]), int(groups[1])
+                return None, int(groups[0])
+        return None
+
+    def describe(self, path):
+        name = self.normalize(path)
+        return self.tokenize(name), self.episode_key(name)
+
+    def candidates(self, tokens, episode):
+        found = set()
+        if episode:
+            found.update(self.episode_index.get(episode[1], ()))
+
+        # Rarest tokens first; the show title alone would pull in the whole folder
+        postings = sorted((self.token_index[t] for t in tokens if t in self.token_index), key=len)
+        for posting in postings:
+            if found and len(found) + len(posting) > self.MAX_CANDIDATES:
+                break
+            found.update(posting)
+        return found
+
+    def title_tokens(self, tokens):
+        return {t for t in tokens if not t.isdigit() and t not in self.EPISODE_WORDS}
+
+    def score(self, tokens, episode, sub_id):
+        sub_tokens, sub_episode = self.entries[sub_id]
+        bonus = 0.0
+        if episode and sub_episode:
+            if episode[1] != sub_episode[1]:
+                return 0.0
+            if episode[0] is not None and sub_episode[0] is not None and episode[0] != sub_episode[0]:
+                return 0.0
+            titles, sub_titles = self.title_tokens(tokens), self.title_tokens(sub_tokens)
+            # The same episode number of another show is not a match; names with
+            # no title at all (E05.mkv, E05.srt) have only the number to go on
+            if titles & sub_titles or not (titles or sub_titles or
+                                           (episode[0] is None) != (sub_episode[0] is None)):
+                bonus = 0.5
+
+        union = tokens | sub_tokens
+        overlap = len(tokens & sub_tokens) / len(union) if union else 0.0
+        return overlap + bonus
+
+    def match(self, video_paths):
+        """Map every video path to its subtitle path (or None); no subtitle is used twice"""
+        edges = []
+        for video_id, video_path in enumerate(video_paths):
+            tokens, episode = self.describe(video_path)
+            for sub_id in self.candidates(tokens, episode):
+                score = self.score(tokens, episode, sub_id)
+                if score >= self.min_score:
+                    edges.append((score, video_id, sub_id))
+
+        # Greedy assignment over all pairs, best scores first
+        edges.sort(key=lambda edge: (-edge[0], edge[1], edge[2]))
+        matches = {path: None for path in video_paths}
+        used_videos, used_subs = set(), set()
+        for score, video_id, sub_id in edges:
+            if video_id in used_videos or sub_id in used_subs:
+                continue
+            used_videos.add(video_id)
+            used_subs.add(sub_id)
+            matches[video_paths[video_id]] = self.subtitle_paths[sub_id]
+        return matches
+
+
+# ---SUBTITLE STYLE--- #
+def build_force_style(settings):
+    """libass force_style string for the subtitle settings the GUI and manifests use"""
+    force_style_parts = []
+
+    if settings.get('font_enabled', False):
+        font_size = settings.get('font_size', 16)
+        font_name = settings.get('font_name', 'Arial')
+        force_style_parts.append(f"FontSize={font_size}")
+        force_style_parts.append(f"FontName={font_name}")
+
+    if settings.get('color_enabled', False):
+        color = settings.get('font_color', '#FFFFFF')
+        # Convert hex to BGR for ASS format
+        if color.startswith('#'):
+            hex_color = color[1:]
+            r = int(hex_color[0:2], 16)
+            g = int(hex_color[2:4], 16)
+            b = int(hex_color[4:6], 16)
+            bgr_color = f"&H00{b:02X}{g:02X}{r:02X}"
+            force_style_parts.append(f"PrimaryColour={bgr_color}")
+
+    if settings.get('border_enabled', False):
+        border_style = settings.get('border_style', 3)
+        force_style_parts.append(f"BorderStyle={border_style}")
+        force_style_parts.append(f"Outline=2")
+        force_style_parts.append(f"Shadow=1")
+
+    # Default minimal styling if nothing is enabled
+    if not force_style_parts:
+        force_style_parts = ["FontSize=16", "BorderStyle=3", "Outline=2"]
+
+    return ",".join(force_style_parts)
+
+
+def parse_force_style(force_style):
+    """{field: value} from a force_style string such as FontSize=16,BorderStyle=3"""
+    style = {}
+    for part in force_style.split(","):
+        key, sep, value = part.partition("=")
+        if sep:
+            style[key.strip()] = value.strip()
+    return style
+
+
+def escape_filter_value(value):
+    """Escape a filter option value for both levels of ffmpeg's filtergraph parsing"""
+    # Option level: the filter's own key=value:key=value parser
+    value = re.sub(r"([\\':])", r"\\\1", value)
+    # Graph level: the parser that splits filters and chains
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
+
+
+def build_subtitle_filter(subtitle_path, force_style=None, offset=0.0):
+    """subtitles= filter for a file; force_style is only needed for files not pre-styled"""
+    subtitle_filter = f"subtitles=filename={escape_filter_value(subtitle_path.replace(os.sep, '/'))}"
+    if force_style:
+        subtitle_filter += f":force_style={escape_filter_value(force_style)}"
+
+    # Input seeking restarts timestamps at 0, so shift the frames to their place
+    # on the subtitle timeline while rendering and back again afterwards
+    if offset:
+        subtitle_filter = f"setpts=PTS+{offset:.6f}/TB,{subtitle_filter},setpts=PTS-STARTPTS"
+    return subtitle_filter
+
+
+# ---SUBTITLE PREPROCESSING--- #
+# Bump when the converted output changes, so cached files are rebuilt
+SUBTITLE_CONVERTER_VERSION = 2
+ASS_EXTS = (".ass", ".ssa")
+TEXT_SUBTITLE_EXTS = (".srt", ".vtt")
+
+# The style and canvas ffmpeg gives SRT/VTT files before force_style applies
+DEFAULT_ASS_STYLE = {
+    'Name': "Default", 'Fontname': "Arial", 'Fontsize': "16",
+    'PrimaryColour': "&Hffffff", 'SecondaryColour': "&Hffffff", 'OutlineColour': "&H0", 'BackColour': "&H0",
+    'Bold': "0", 'Italic': "0", 'Underline': "0", 'StrikeOut': "0",
+    'ScaleX': "100", 'ScaleY': "100", 'Spacing': "0", 'Angle': "0",
+    'BorderStyle': "1", 'Outline': "1", 'Shadow': "0", 'Alignment': "2",
+    'MarginL': "10", 'MarginR': "10", 'MarginV': "10", 'Encoding': "0",
+}
+ASS_SCRIPT_INFO = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 384
+PlayResY: 288
+ScaledBorderAndShadow: yes
+"""
+ASS_EVENT_FORMAT = "Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+
+SRT_TAGS = [
+    (r"<\s*([ibus])\s*>", lambda m: "{\\%s1}" % m.group(1).lower()),
+    (r"<\s*/\s*([ibus])\s*>", lambda m: "{\\%s0}" % m.group(1).lower()),
+    (r"</\s*font\s*>", lambda m: "{\\c}"),
+]
+# Positioning blocks SRT files borrow from ASS; ffmpeg's SRT decoder keeps them too
+ALIGNMENT_TAG = re.compile(r"(\{\\(?:an[1-9]|a(?:1[01]|[1-9]))\})")
+FONT_COLOR_TAG = re.compile(r"<\s*font[^>]*color\s*=\s*[\"']?#?([0-9a-fA-F]{6})[\"']?[^>]*>", re.IGNORECASE)
+TIMING_LINE = re.compile(r"([\d:.,]+)\s*-->\s*([\d:.,]+)")
+
+
+def parse_timestamp(value):
+    """Seconds from an SRT/VTT (00:01:02,500 or 01:02.500) or ASS (0:01:02.50) timestamp"""
+    parts = value.strip().replace(",", ".").split(":")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def format_ass_timestamp(seconds):
+    centiseconds = max(0, round(seconds * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    return f"{hours}:{minutes:02d}:{centiseconds // 100:02d}.{centiseconds % 100:02d}"
+
+
+def read_subtitle_text(subtitle_path):
+    """Subtitle file contents; files that are not UTF-8 are read as Windows-1252"""
+    with open(subtitle_path, 'rb') as f:
+        data = f.read()
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1252', errors='replace')
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def parse_subtitle_cues(subtitle_path):
+    """(start, end, text) of every cue in an SRT, VTT or ASS/SSA file, in file order.
+
+    Text keeps the source markup: HTML-like tags for SRT/VTT, override blocks for ASS.
+    """
+    ext = os.path.splitext(subtitle_path)[1].lower()
+    content = read_subtitle_text(subtitle_path)
+    cues = []
+
+    if ext in ASS_EXTS:
+        fields = [name.strip() for name in ASS_EVENT_FORMAT.split(",")]
+        for line in content.split("\n"):
+            if line.startswith("Format:") and "Text" in line:
+                fields = [name.strip() for name in line.split(":", 1)[1].split(",")]
+            elif line.startswith("Dialogue:"):
+                values = line.split(":", 1)[1].split(",", len(fields) - 1)
+                event = dict(zip(fields, values))
+                try:
+                    cues.append((parse_timestamp(event['Start']), parse_timestamp(event['End']),
+                                 event.get('Text', "")))
+                except (KeyError, ValueError):
+                    continue
+        return cues
+
+    if ext not in TEXT_SUBTITLE_EXTS:
+        raise ValueError(f"unsupported subtitle format {ext or '(none)'}")
+
+    # SRT and VTT are both blank-line separated blocks around a "start --> end" line;
+    # VTT headers, NOTE and STYLE blocks have no timing line and drop out
+    for block in re.split(r"\n\s*\n", content):
+        lines = block.strip("\n").split("\n")
+        for i, line in enumerate(lines):
+            match = TIMING_LINE.search(line)
+            if match:
+                try:
+                    start, end = parse_timestamp(match.group(1)), parse_timestamp(match.group(2))
+                except ValueError:
+                    break
+                cues.append((start, end, "\n".join(lines[i + 1:]).strip()))
+                break
+    return cues
+
+
+def markup_to_ass(text, vtt=False):
+    """ASS event text from SRT/VTT markup: basic tags become override blocks, the rest is dropped"""
+    # Split keeps the alignment blocks at odd indexes; every other brace is literal text
+    parts = ALIGNMENT_TAG.split(text)
+    text = "".join(part if i % 2 else part.replace("{", "\\{").replace("}", "\\}") for i, part in enumerate(parts))
+    text = FONT_COLOR_TAG.sub(lambda m: "{\\c&H%s%s%s&}" % (m.group(1)[4:6], m.group(1)[2:4], m.group(1)[0:2]),
+                             text)
+    for pattern, replacement in SRT_TAGS:
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    text = re.sub(r"<[^>]*>", "", text)
+    if vtt:
+        text = html.unescape(text)
+    return text.replace("\n", "\\N")
+
+
+def apply_force_style(style, force_style):
+    """Override style fields the way libass applies force_style: by name, ignoring case"""
+    names = {name.lower(): name for name in style}
+    for key, value in parse_force_style(force_style).items():
+        if key.lower() in names:
+            style[names[key.lower()]] = value
+    return style
+
+
+def build_styled_ass(subtitle_path, force_style):
+    """A complete ASS script for a subtitle file with force_style already applied"""
+    ext = os.path.splitext(subtitle_path)[1].lower()
+    if ext in ASS_EXTS:
+        # Keep the author's script, only override every style like libass would
+        output = []
+        style_fields = None
+        for line in read_subtitle_text(subtitle_path).split("\n"):
+            stripped = line.strip()
+            if stripped.startswith("[") and stripped.endswith("]"):
+                style_fields = [] if stripped.lower() in ("[v4+ styles]", "[v4 styles]") else None
+            elif style_fields is not None and line.startswith("Format:"):
+                style_fields = [name.strip() for name in line.split(":", 1)[1].split(",")]
+            elif style_fields and line.startswith("Style:"):
+                values = [value.strip() for value in line.split(":", 1)[1].split(",", len(style_fields) - 1)]
+                style = apply_force_style(dict(zip(style_fields, values)), force_style)
+                line = "Style: " + ",".join(style[name] for name in style_fields if name in style)
+            output.append(line)
+        return "\n".join(output)
+
+    cues = parse_subtitle_cues(subtitle_path)
+    if not cues:
+        raise ValueError("no cues found")
+    style = apply_force_style(dict(DEFAULT_ASS_STYLE), force_style)
+    lines = [
+        ASS_SCRIPT_INFO,
+        "[V4+ Styles]",
+        "Format: " + ", ".join(style),
+        "Style: " + ",".join(style.values()),
+        "",
+        "[Events]",
+        "Format: " + ASS_EVENT_FORMAT,
+    ]
+    for start, end, text in cues:
+        lines.append(f"Dialogue: 0,{format_ass_timestamp(start)},{format_ass_timestamp(end)},Default,,0,0,0,,"
+                     f"{markup_to_ass(text, vtt=(ext == '.vtt'))}")
+    return "\n".join(lines) + "\n"
+
+
+def prepare_styled_subtitle(subtitle_path, force_style, cache_dir=None):
+    """Path of a pre-styled ASS copy of a subtitle, converted once per content and style.
+
+    The file is named by a hash under the user cache directory, so its path
+    never carries the quotes, brackets or colons of the original name.
+    Raises ValueError for formats that cannot be converted.
+    """
+    with open(subtitle_path, 'rb') as f:
+        digest = hashlib.sha256(f.read())
+    digest.update(f"\0{force_style}\0{os.path.splitext(subtitle_path)[1].lower()}\0"
+                  f"{SUBTITLE_CONVERTER_VERSION}".encode('utf-8'))
+
+    cache_dir = cache_dir or os.path.join(user_cache_dir(), "subtitles")
+    styled_path = os.path.join(cache_dir, f"{digest.hexdigest()[:32]}.ass")
+    if os.path.exists(styled_path):
+        return styled_path
+
+    content = build_styled_ass(subtitle_path, force_style)
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{styled_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, styled_path)
+    return styled_path
+
+
+# ---STREAM PREFLIGHT--- #
+# Audio MP4 players take as-is; anything else ffmpeg can decode is re-encoded to AAC
+MP4_AUDIO_CODECS = ('aac', 'mp3', 'ac3', 'eac3', 'alac')
+AAC_KBPS_PER_CHANNEL = 64
+PROBE_ENTRIES = "stream=index,codec_type,codec_name,pix_fmt,width,height,channels:stream_disposition=attached_pic" \
+                ":format=duration"
+
+
+def plan_streams(streams, output_mode='faststart'):
+    """Decide what each probed input stream becomes in the output.
+
+    Returns {'video': stream, 'audio': [(index, 'copy' | 'aac', channels)], 'dropped': [reason]}.
+    Matroska takes any audio codec as-is, MP4 only MP4_AUDIO_CODECS.
+    Raises ValueError when the input can't produce an output at all.
+    """
+    # Cover art is a video stream too, but never the one to burn subtitles into
+    videos = [stream for stream in streams if stream.get('codec_type') == 'video'
+              and not (stream.get('disposition') or {}).get('attached_pic')]
+    if not videos:
+        raise ValueError("No video stream found")
+    video = videos[0]
+    if not video.get('codec_name') or video['codec_name'] == 'none':
+        raise ValueError("The video stream uses a codec this FFmpeg cannot decode")
+
+    audio, dropped = [], []
+    for stream in streams:
+        if stream.get('codec_type') != 'audio':
+            continue
+        codec = stream.get('codec_name')
+        if not codec or codec == 'none':
+            dropped.append(f"audio stream {stream.get('index')} (no decoder)")
+        elif codec in MP4_AUDIO_CODECS or output_mode == 'mkv':
+            audio.append((stream['index'], 'copy', stream.get('channels')))
+        else:
+            audio.append((stream['index'], 'aac', stream.get('channels')))
+    return {'video': video, 'audio': audio, 'dropped': dropped}
+
+
+def audio_args(plan, input_number=0):
+    """-map and codec arguments for the planned audio streams of one ffmpeg input"""
+    args = []
+    for output_index, (index, action, channels) in enumerate(plan['audio']):
+        args += ["-map", f"{input_number}:{index}"]
+        if action == 'copy':
+            args += [f"-c:a:{output_index}", "copy"]
+        else:
+            bitrate = AAC_KBPS_PER_CHANNEL * min(max(channels or 2, 1), 8)
+            args += [f"-c:a:{output_index}", "aac", f"-b:a:{output_index}", f"{bitrate}k"]
+    return args
+
+
+# ---OUTPUT CONTAINER--- #
+# (extension, muxer arguments) of every way to write the finished file:
+#   faststart   MP4 with its index up front; ffmpeg rewrites the whole file once at the end
+#   fragmented  MP4 written as self-contained fragments; no rewrite, and a cut-off file still plays
+#   mkv         Matroska; no rewrite, cut-off files play, and any audio codec can be copied
+OUTPUT_MODES = {
+    'faststart': (".mp4", ["-movflags", "+faststart"]),
+    'fragmented': (".mp4", ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]),
+    'mkv': (".mkv", []),
+}
+NETWORK_FILESYSTEMS = (
+    "nfs", "nfs4", "cifs", "smbfs", "smb3", "afpfs", "webdav", "davfs", "fuse.sshfs", "fuse.rclone",
+    "9p", "ceph", "glusterfs", "lustre",
+)
+
+
+def mount_filesystem(path, mounts):
+    """Filesystem type of the longest (mount point, type) entry containing path, or None"""
+    best, fstype = "", None
+    for mount_point, mount_type in mounts:
+        prefix = mount_point.rstrip("/") + "/"
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype
+
+
+def destination_kind(folder):
+    """'network', 'hdd', 'ssd' or 'unknown': the kind of storage a folder is on"""
+    path = os.path.realpath(folder)
+    # The output folder may not exist yet; its nearest existing parent is on the same storage
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0]
+        if drive.startswith("\\\\"):
+            return 'network'
+        DRIVE_REMOTE = 4
+        return 'network' if ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == DRIVE_REMOTE else 'unknown'
+
+    if sys.platform == "darwin":
+        try:
+            output = subprocess.run(["mount"], stdout=subprocess.PIPE, text=True, timeout=10).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return 'unknown'
+        mounts = re.findall(r"^.+? on (.+) \((\w+)", output, re.MULTILINE)
+        return 'network' if mount_filesystem(path, mounts) in NETWORK_FILESYSTEMS else 'unknown'
+
+    try:
+        with open("/proc/self/mounts", encoding='utf-8') as f:
+            mounts = [(fields[1].replace("\\040", " "), fields[2]) for fields in (line.split() for line in f)
+                      if len(fields) > 2]
+    except OSError:
+        return 'unknown'
+    if mount_filesystem(path, mounts) in NETWORK_FILESYSTEMS:
+        return 'network'
+
+    # Partitions have no queue of their own; their parent disk's says whether it spins
+    device = os.stat(path).st_dev
+    block = f"/sys/dev/block/{os.major(device)}:{os.minor(device)}"
+    for rotational in (os.path.join(block, "queue", "rotational"), os.path.join(block, "..", "queue", "rotational")):
+        try:
+            with open(rotational) as f:
+                return 'hdd' if f.read().strip() == "1" else 'ssd'
+        except OSError:
+            continue
+    return 'unknown'
+
+
+def default_output_mode(folder):
+    """Fragmented MP4 where rewriting a whole file is slow (network shares, spinning disks), faststart elsewhere"""
+    return 'fragmented' if destination_kind(folder) in ('network', 'hdd') else 'faststart'
+
+
+def publish_file(source, destination):
+    """Move a finished file into place so it appears complete or not at all.
+
+    Within one filesystem that is a rename. Across filesystems the file is
+    copied under a hidden name next to the destination first, then renamed.
+    """
+    try:
+        os.replace(source, destination)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    temp_path = os.path.join(os.path.dirname(destination), f".{os.path.basename(destination)}.{os.getpid()}.partial")
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, destination)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    os.remove(source)
+
+
+# ---INPUT PREFETCH--- #
+PREFETCH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class InputPrefetcher:
+    """Copies upcoming inputs from slow storage to a local folder while earlier jobs encode.
+
+    One thread copies files in the order the jobs start, as long as the local
+    copies stay within a byte budget. acquire() gives an encode its local copy
+    (waiting for one in flight); release() deletes it once the last job reading
+    it is done, which frees budget for the next file. Files on the same disk as
+    the folder, or larger than the whole budget, are read in place. An optional
+    room() callback gives the bytes the folder's disk can spare; a copy that
+    doesn't fit waits for it, and evict() hands space back to the encodes.
+    """
+
+    def __init__(self, folder, budget_bytes, room=None):
+        self.folder = folder
+        self.budget = budget_bytes
+        self.room = room
+        self.work_dir = None
+        self.device = None
+        # Source path -> {'state', 'size', 'path', 'readers'}; states go pending ->
+        # copying -> ready -> released, or to 'direct' when the source is read in place
+        self.entries = {}
+        self.queue = deque()
+        self.used = 0
+        self.copying = 0
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = None
+
+    def start(self, paths):
+        """Begin copying paths in order; raises OSError if the folder is unusable"""
+        os.makedirs(self.folder, exist_ok=True)
+        self.work_dir = tempfile.mkdtemp(prefix=".hardsubber_prefetch_", dir=self.folder)
+        self.device = local_device = os.stat(self.work_dir).st_dev
+        with self.cond:
+            for path in dict.fromkeys(paths):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_dev == local_device or stat.st_size > self.budget:
+                    continue
+                name = f"{len(self.entries):04d}_{os.path.basename(path)}"
+                self.entries[path] = {'state': 'pending', 'size': stat.st_size,
+                                      'path': os.path.join(self.work_dir, name), 'readers': 0}
+                self.queue.append(path)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.queue and self.entries[self.queue[0]]['state'] != 'pending':
+                    self.queue.popleft()
+                if self.closed or not self.queue:
+                    return
+                source = self.queue[0]
+                entry = self.entries[source]
+                # Wait for finished jobs to give back enough of the budget
+                while not self.closed and entry['state'] == 'pending' and self.used + entry['size'] > self.budget:
+                    self.cond.wait()
+                if self.closed or entry['state'] != 'pending':
+                    continue
+
+            # Checked outside the lock: room() looks at the disk and at the encodes' reservations
+            if self.room and entry['size'] > self.room():
+                with self.cond:
+                    # Look again shortly, unless the job reads the source in place meanwhile
+                    self.cond.wait(timeout=5)
+                continue
+
+            with self.cond:
+                if self.closed or entry['state'] != 'pending':
+                    continue
+                self.queue.popleft()
+                entry['state'] = 'copying'
+                self.used += entry['size']
+                self.copying = entry['size']
+
+            copied = self.copy(source, entry)
+
+            with self.cond:
+                self.copying = 0
+                if copied and entry['state'] == 'copying':
+                    entry['state'] = 'ready'
+                else:
+                    # Failed, or released while it was still copying
+                    self.discard(entry, 'direct' if entry['state'] == 'copying' else 'released')
+                self.cond.notify_all()
+
+    def copy(self, source, entry):
+        temp_path = f"{entry['path']}.partial"
+        try:
+            with open(source, 'rb') as src, open(temp_path, 'wb') as dst:
+                while True:
+                    if self.closed or entry['state'] != 'copying':
+                        break
+                    chunk = src.read(PREFETCH_CHUNK_SIZE)
+                    if not chunk:
+                        os.replace(temp_path, entry['path'])
+                        return True
+                    dst.write(chunk)
+        except OSError as e:
+            print(f"Could not prefetch {os.path.basename(source)}, reading it in place: {e}")
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+
+    def discard(self, entry, state):
+        try:
+            os.remove(entry['path'])
+        except OSError:
+            pass
+        self.used -= entry['size']
+        entry['state'] = state
+
+    def acquire(self, source):
+        """Path an encode should read: the local copy if there is (or will shortly be) one, else the source"""
+        with self.cond:
+            entry = self.entries.get(source)
+            if not entry:
+                return source
+            if entry['state'] == 'pending':
+                # The copier hasn't got to it; reading in place beats waiting
+                entry['state'] = 'direct'
+                self.cond.notify_all()
+                return source
+            while entry['state'] == 'copying' and not self.closed:
+                self.cond.wait()
+            if entry['state'] != 'ready':
+                return source
+            entry['readers'] += 1
+            return entry['path']
+
+    def local_path(self, source):
+        """The local copy of source if it is ready, else source itself"""
+        entry = self.entries.get(source)
+        return entry['path'] if entry and entry['state'] == 'ready' else source
+
+    def release(self, source, acquired=True):
+        """A job is done with source; acquired=False for a job that never called acquire()"""
+        with self.cond:
+            entry = self.entries.get(source)
+            if not entry:
+                return
+            if acquired and entry['readers']:
+                entry['readers'] -= 1
+            if entry['readers']:
+                # Another job sharing the file (a subtitle used twice) still reads the copy
+                return
+            if entry['state'] == 'pending':
+                entry['state'] = 'direct'
+            elif entry['state'] == 'copying':
+                # The copier notices, stops and cleans up
+                entry['state'] = 'released'
+            elif entry['state'] == 'ready':
+                self.discard(entry, 'released')
+            self.cond.notify_all()
+
+    def evict(self):
+        """Delete every local copy no encode is reading, stopping one in flight; True if any space came back.
+
+        The sources are read in place instead, so encodes never fail for room
+        the read-ahead took.
+        """
+        with self.cond:
+            evicted = False
+            for entry in self.entries.values():
+                if entry['readers']:
+                    continue
+                if entry['state'] == 'copying':
+                    entry['state'] = 'released'
+                    evicted = True
+                elif entry['state'] == 'ready':
+                    self.discard(entry, 'direct')
+                    evicted = True
+            self.cond.notify_all()
+            # The copier deletes a cancelled copy's partial file before it moves on
+            while self.copying and not self.closed:
+                self.cond.wait()
+            return evicted
+
+    def cancel(self):
+        """Stop copying and wake every waiting encode"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def close(self):
+        """Stop and delete every local copy"""
+        self.cancel()
+        if self.thread:
+            self.thread.join()
+        if self.work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+# ---JOB JOURNAL--- #
+class JobJournal:
+    """SQLite journal of a batch: each job's inputs, settings and state changes.
+
+    Every write commits immediately, so after a crash or reboot the file still
+    says which jobs finished and which outputs were left half-written.
+    """
+    FILENAME = ".hardsubber_queue.sqlite"
+    FINAL_STATES = ('done', 'skipped')
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        # Pool workers write state changes, so the connection is shared behind a lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.conn.execute("PRAGMA synchronous=FULL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS batch (
+                key TEXT PRIMARY KEY, value TEXT)""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY, position INTEGER, video_path TEXT, subtitle_path TEXT,
+                output_path TEXT, state TEXT, updated_at REAL)""")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT, state TEXT, detail TEXT, at REAL)""")
+
+    @classmethod
+    def for_folder(cls, folder):
+        return cls(os.path.join(folder, cls.FILENAME))
+
+    def start_batch(self, jobs, settings):
+        """Replace the journal with a new batch of (job_id, video_path, subtitle_path, state)"""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM batch")
+            self.conn.execute("DELETE FROM jobs")
+            self.conn.execute("DELETE FROM events")
+            self.conn.execute("INSERT INTO batch VALUES ('settings', ?)", (json.dumps(settings),))
+            self.conn.executemany(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, NULL, ?, ?)",
+                [(job_id, position, video_path, subtitle_path, state, now)
+                 for position, (job_id, video_path, subtitle_path, state) in enumerate(jobs)]
+            )
+            self.conn.execute("COMMIT")
+
+    def set_state(self, job_id, state, output_path=None, detail=None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            if output_path:
+                self.conn.execute("UPDATE jobs SET state = ?, output_path = ?, updated_at = ? WHERE job_id = ?",
+                                  (state, output_path, now, job_id))
+            else:
+                self.conn.execute("UPDATE jobs SET state = ?, updated_at = ? WHERE job_id = ?",
+                                  (state, now, job_id))
+            self.conn.execute("INSERT INTO events (job_id, state, detail, at) VALUES (?, ?, ?, ?)",
+                              (job_id, state, detail, now))
+            self.conn.execute("COMMIT")
+
+    def settings(self):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM batch WHERE key = 'settings'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def jobs(self):
+        """All jobs in queue order as dicts"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT job_id, video_path, subtitle_path, output_path, state FROM jobs ORDER BY position"
+            ).fetchall()
+        return [
+            {'job_id': job_id, 'video_path': video_path, 'subtitle_path': subtitle_path,
+             'output_path': output_path, 'state': state}
+            for job_id, video_path, subtitle_path, output_path, state in rows
+        ]
+
+    def unfinished_jobs(self):
+        return [job for job in self.jobs() if job['state'] not in self.FINAL_STATES]
+
+    def discard_partial_outputs(self):
+        """Delete outputs of jobs that were still encoding when the batch stopped"""
+        for job in self.unfinished_jobs():
+            if job['state'] in ('running', 'interrupted') and job['output_path']:
+                try:
+                    os.remove(job['output_path'])
+                except OSError:
+                    pass
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def remove(self):
+        self.close()
+        for suffix in ("", "-journal"):
+            try:
+                os.remove(self.path + suffix)
+            except OSError:
+                pass
+
+
+# ---FILE HASHING--- #
+HASH_CHUNK_SIZE = 1 << 20
+HASH_SAMPLES = 16
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 of every byte; slow on big videos, kept for verification"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return "full:" + digest.hexdigest()
+
+
+def sampled_hash(path, chunk_size=HASH_CHUNK_SIZE, samples=HASH_SAMPLES):
+    """SHA-256 of the file size plus the head, tail and evenly spaced middle chunks.
+
+    Reads about samples + 2 chunks through a memory map however large the
+    file is; files smaller than that are hashed in full.
+    """
+    size = os.path.getsize(path)
+    if size <= chunk_size * (samples + 2):
+        return hash_file(path, chunk_size)
+
+    digest = hashlib.sha256(size.to_bytes(8, 'little'))
+    step = (size - chunk_size) // (samples + 1)
+    offsets = [step * i for i in range(samples + 2)]
+    offsets[-1] = size - chunk_size
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        for offset in offsets:
+            digest.update(view[offset:offset + chunk_size])
+    return "sampled:" + digest.hexdigest()
+
+
+def hash_files(paths, full=False, max_workers=8):
+    """Hash many files on a thread pool; unreadable files map to None"""
+    hasher = hash_file if full else sampled_hash
+
+    def safe_hash(path):
+        try:
+            return hasher(path)
+        except (OSError, ValueError):
+            return None
+
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as pool:
+        return dict(zip(paths, pool.map(safe_hash, paths)))
+
+
+# ---OUTPUT CACHE--- #
+class OutputCache:
+    """Index of finished outputs keyed by a fingerprint of everything that shapes them.
+
+    The fingerprint covers the video and subtitle contents and the full encode
+    settings, so a match can be reused, hard-linked or copied instead of encoded.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or self.default_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        with self.lock:
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS outputs (
+                fingerprint TEXT, path TEXT, size INTEGER, mtime_ns INTEGER, created_at REAL,
+                PRIMARY KEY (fingerprint, path))""")
+
+    @staticmethod
+    def default_path():
+        return os.path.join(user_cache_dir(), "output_cache.sqlite")
+
+    @staticmethod
+    def fingerprint(video_hash, subtitle_hash, settings):
+        key = json.dumps({'video': video_hash, 'subtitle': subtitle_hash, 'settings': settings}, sort_keys=True)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def lookup(self, fingerprint):
+        """Path of an unmodified output for this fingerprint, or None"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT path, size, mtime_ns FROM outputs WHERE fingerprint = ? ORDER BY created_at DESC",
+                (fingerprint,)
+            ).fetchall()
+        for path, size, mtime_ns in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stat = None
+            if stat and stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+                return path
+            # Deleted or rewritten since it was recorded
+            with self.lock:
+                self.conn.execute("DELETE FROM outputs WHERE fingerprint = ? AND path = ?", (fingerprint, path))
+        return None
+
+    def store(self, fingerprint, path):
+        stat = os.stat(path)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)",
+                              (fingerprint, path, stat.st_size, stat.st_mtime_ns, time.time()))
+
+    def reuse(self, fingerprint, output_path):
+        """Put a cached output at output_path; returns False on a cache miss"""
+        source = self.lookup(fingerprint)
+        if not source:
+            return False
+        if os.path.exists(output_path) and os.path.samefile(source, output_path):
+            return True
+
+        temp_path = f"{output_path}.cache-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            # Different volume or no hard link support
+            shutil.copy2(source, temp_path)
+        os.replace(temp_path, output_path)
+        self.store(fingerprint, output_path)
+        return True
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ---DISK SPACE--- #
+# Estimates are padded, since running out of space costs a whole encode
+SIZE_ESTIMATE_MARGIN = 1.25
+
+
+class OutputSizeHistory:
+    """Output size relative to source size of past encodes, per encode settings.
+
+    Stored as JSON in the user cache, so a batch's size estimates start from
+    what earlier batches with the same preset and quality produced.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(user_cache_dir(), "output_sizes.json")
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.ratios = dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            self.ratios = {}
+
+    def ratio(self, key):
+        return self.ratios.get(key)
+
+    def record(self, key, ratio):
+        with self.lock:
+            previous = self.ratios.get(key)
+            # Follow a bigger output at once and a smaller one slowly: overestimating only delays a job
+            self.ratios[key] = ratio if previous is None else max(ratio, 0.7 * previous + 0.3 * ratio)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                temp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.ratios, f)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                print(f"Could not save output size history: {e}")
+
+
+# ---ENCODE ENGINE--- #
+class EncodeEngine:
+    """Encodes a batch of (job_id, video_path, subtitle_path) on a worker pool.
+
+    Jobs start pinned ones first in the given order, then largest first (see
+    schedule()). Reports through plain callbacks, so the GUI thread wrapper
+    and the command line share it:
+      on_progress(snapshot)                                   once per progress tick
+      on_video_completed(job_id, video_name, success, output_path)
+      on_error(video_name, message)
+    """
+
+    def __init__(self, video_pairs, output_folder, speed_preset, subtitle_settings, max_workers=1, journal=None,
+                 output_cache=None, pinned=(), on_progress=None, on_video_completed=None, on_error=None):
+        self.video_pairs = video_pairs
+        self.pinned = set(pinned)
+        self.on_progress = on_progress or (lambda snapshot: None)
+        self.on_video_completed = on_video_completed or (lambda job_id, video_name, success, output_path: None)
+        self.on_error = on_error or (lambda video_name, message: None)
+        self.journal = journal
+        self.output_cache = output_cache
+        self.ffmpeg_version = None
+        self.file_hashes = {}
+        self.styled_subtitles = {}
+        self.output_folder = output_folder
+        self.speed_preset = speed_preset
+        self.subtitle_settings = subtitle_settings
+        self.is_running = True
+        self.start_time = None
+        self.processed_count = 0
+        self.cancelled = False
+
+        # ETA inputs: media seconds of the queue (probed up front), how many
+        # belong to finished jobs, and the smoothed combined encode speed
+        self.media_info = {}
+        self.stream_plans = {}
+        self.durations = {}
+        self.total_media = 0.0
+        self.finished_media = 0.0
+        self.throughput = 0.0
+        # Media seconds of every planned job and how many of them smart render
+        # stream-copies; their ratio guesses the copied share of unplanned jobs
+        self.planned_media = 0.0
+        self.copied_media = 0.0
+
+        # Segment mode splits each long video across all the workers, while
+        # shorter videos keep running side by side
+        self.max_workers = max(1, int(max_workers))
+        self.segment_enabled = subtitle_settings.get('segment_enabled', False) and self.max_workers > 1
+        self.segment_min_duration = subtitle_settings.get('segment_min_minutes', 20) * 60
+        self.smart_render_enabled = subtitle_settings.get('smart_render_enabled', False)
+        self.longest_first = subtitle_settings.get('schedule_longest_first', True)
+        # 'auto' picks a mode per output folder, see default_output_mode()
+        self.output_mode = subtitle_settings.get('output_mode', 'auto')
+        self.folder_modes = {}
+
+        # With a scratch folder, encodes are written there and a single publisher
+        # thread moves each finished file to its destination
+        self.scratch_folder = subtitle_settings.get('scratch_folder') or None
+        self.publisher = None
+        self.failed_publishes = 0
+
+        # Input prefetch copies the next jobs' sources from slow storage to the
+        # scratch folder (or the temp folder) while the current ones encode
+        self.prefetch_enabled = subtitle_settings.get('prefetch_enabled', False)
+        self.prefetch_budget = int(subtitle_settings.get('prefetch_budget_gb', 20) * 1024 ** 3)
+        self.prefetcher = None
+
+        # Disk space admission: a job only starts if its estimated output fits on
+        # the encode and output volumes next to what running jobs still have to write
+        self.disk_check_enabled = subtitle_settings.get('disk_check_enabled', True)
+        self.min_free = int(subtitle_settings.get('min_free_gb', 2) * 1024 ** 3)
+        self.size_history = None
+        self.reservations = {}
+        self.waiting_for_space = {}
+        self.space_cond = threading.Condition()
+
+        # Worker pool: every job gets an equal share of the cores for x264; a split
+        # job waits for the pool to drain, then takes every worker and core
+        # A batch smaller than the pool (a cluster worker's single leased job) keeps every core
+        self.job_workers = max(1, min(self.max_workers, len(video_pairs)))
+        self.threads_per_job = max(1, (os.cpu_count() or 1) // self.job_workers)
+        self.pool_cond = threading.Condition()
+        self.active_encodes = 0
+        self.split_waiting = 0
+        self.split_running = False
+
+        # Progress is reported as one snapshot per tick, however many jobs run
+        self.progress_interval = 1.0 / max(1, subtitle_settings.get('ui_refresh_hz', 5))
+
+        # Per-job state, keyed by the caller's job id
+        self.jobs = {}
+        self.jobs_lock = threading.Lock()
+
+    def stop(self):
+        self.is_running = False
+        self.cancelled = True
+        if self.prefetcher:
+            self.prefetcher.cancel()
+        for cond in (self.space_cond, self.pool_cond):
+            with cond:
+                cond.notify_all()
+        with self.jobs_lock:
+            for job in self.jobs.values():
+                self.terminate_job(job)
+
+    def skip(self, job_id=None):
+        """Skip one running job, or every running job if no id is given"""
+        with self.jobs_lock:
+            for running_id, job in self.jobs.items():
+                if job_id is None or running_id == job_id:
+                    job['skip'] = True
+                    self.terminate_job(job)
+        for cond in (self.space_cond, self.pool_cond):
+            with cond:
+                cond.notify_all()
+
+    def terminate_job(self, job):
+        for process in job['processes']:
+            if process.poll() is None:
+                try:
+                    process.terminate()
+                except OSError:
+                    pass
+
+    def job_aborted(self, job):
+        return not self.is_running or self.cancelled or job['skip']
+
+    def record_state(self, job_id, state, output_path=None, detail=None):
+        """Write a state change to the job journal, if the batch has one"""
+        if not self.journal:
+            return
+        try:
+            self.journal.set_state(job_id, state, output_path, detail)
+        except sqlite3.Error as e:
+            # A broken journal costs resumability, not the running encodes
+            print(f"Job journal write failed: {e}")
+
+    def input_path(self, path):
+        """Where ffmpeg should read a source: its prefetched local copy, if there is one"""
+        return self.prefetcher.local_path(path) if self.prefetcher else path
+
+    def get_file_size_mb(self, path):
+        try:
+            return os.path.getsize(path) / (1024 * 1024)
+        except:
+            return 0.0
+
+    def get_media_info(self, video_path):
+        """Duration, first video stream size and every stream in one probe, or None.
+
+        Returns {'duration', 'width', 'height', 'streams'}; streams are ffprobe's
+        entries with index, codec_type, codec_name, pix_fmt, channels and disposition.
+        """
+        try:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-show_entries", PROBE_ENTRIES, "-of", "json", video_path],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30
+            )
+            info = json.loads(result.stdout)
+            streams = info.get('streams') or []
+            video = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+            return {
+                'duration': float(info['format']['duration']),
+                'width': int(video.get('width') or 0),
+                'height': int(video.get('height') or 0),
+                'streams': streams,
+            }
+        except (OSError, ValueError, KeyError, TypeError, subprocess.TimeoutExpired):
+            return None
+
+    def probe_media(self, video_paths, max_workers=8):
+        """get_media_info() of every video, probed side by side; failed probes are left out"""
+        video_paths = list(dict.fromkeys(video_paths))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(video_paths)))) as pool:
+            infos = dict(zip(video_paths, pool.map(self.get_media_info, video_paths)))
+        return {path: info for path, info in infos.items() if info and info['duration'] > 0}
+
+    def get_keyframes(self, video_path):
+        """Keyframe timestamps of the first video stream, read from packet flags (no decoding)"""
+        try:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", self.input_path(video_path)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=300
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return []
+
+        keyframes = []
+        for line in result.stdout.splitlines():
+            pts_time, _, flags = line.partition(",")
+            if "K" in flags:
+                try:
+                    keyframes.append(float(pts_time))
+                except ValueError:
+                    continue
+        return sorted(keyframes)
+
+    def plan_segments(self, keyframes, total_duration, count):
+        """Split [0, duration) into about `count` ranges that all start on a keyframe, or None without keyframes"""
+        if not keyframes:
+            return None
+
+        cuts = []
+        for k in range(1, count):
+            target = total_duration * k / count
+            nearest = min(keyframes, key=lambda t: abs(t - target))
+            if 0 < nearest < total_duration and nearest not in cuts:
+                cuts.append(nearest)
+        cuts.sort()
+
+        bounds = [0.0] + cuts + [total_duration]
+        return [(start, end, 'encode') for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def preflight(self, video_pairs):
+        """Plan every input's streams before anything is encoded; returns {video_path: error} of hopeless inputs"""
+        rejected = {}
+        for _, video_path, _ in video_pairs:
+            info = self.media_info.get(video_path)
+            if not info:
+                rejected[video_path] = "Could not read the video's duration and streams"
+                continue
+            try:
+                plan = plan_streams(info['streams'], self.output_target(video_path)[1])
+            except ValueError as e:
+                rejected[video_path] = str(e)
+                continue
+            self.stream_plans[video_path] = plan
+            for reason in plan['dropped']:
+                print(f"Dropping {reason} from {os.path.basename(video_path)}")
+        return rejected
+
+    def get_subtitle_cues(self, subtitle_path):
+        """(start, end) of every cue in an SRT, VTT or ASS/SSA file, sorted by start"""
+        try:
+            return sorted((start, end) for start, end, _ in parse_subtitle_cues(subtitle_path))
+        except (OSError, ValueError):
+            return []
+
+    def plan_smart_render(self, keyframes, cues, total_duration):
+        """Mark every GOP that overlaps a cue for encoding and the rest for stream copy"""
+        bounds = [t for t in keyframes if 0 < t < total_duration]
+        bounds = [0.0] + bounds + [total_duration]
+
+        ranges = []
+        cue_index = 0
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            # Both lists are sorted, so cues that ended before this GOP never matter again
+            while cue_index < len(cues) and cues[cue_index][1] <= start:
+                cue_index += 1
+            overlaps = cue_index < len(cues) and cues[cue_index][0] < end
+            mode = 'encode' if overlaps else 'copy'
+
+            if ranges and ranges[-1][2] == mode:
+                ranges[-1] = (ranges[-1][0], end, mode)
+            else:
+                ranges.append((start, end, mode))
+        return ranges
+
+    def job_cost(self, video_path):
+        """Relative encode work of a video: seconds of media times pixels per frame"""
+        info = self.media_info.get(video_path)
+        if not info:
+            return 0.0
+        return info['duration'] * max(1, info['width'] * info['height'])
+
+    def schedule(self, video_pairs):
+        """Start order for the pool: pinned jobs as given, then longest processing time first.
+
+        The pool hands each job to the next free worker, so starting the biggest
+        encodes first leaves only short ones to even out the end of the batch.
+        """
+        pinned = [pair for pair in video_pairs if pair[0] in self.pinned]
+        rest = [pair for pair in video_pairs if pair[0] not in self.pinned]
+        # One job at a time finishes at the same moment in any order, so keep the caller's
+        if self.longest_first and self.job_workers > 1:
+            rest.sort(key=lambda pair: self.job_cost(pair[1]), reverse=True)
+        return pinned + rest
+
+    def break_proof_filename(self, name):
+        return re.sub(r'[<>:"/\\|?*]', "_", name)
+
+    def output_target(self, video_path):
+        """(output path, output mode) for a video"""
+        folder = self.output_folder or os.path.dirname(video_path)
+        mode = self.output_mode
+        if mode not in OUTPUT_MODES:
+            if folder not in self.folder_modes:
+                self.folder_modes[folder] = default_output_mode(folder)
+            mode = self.folder_modes[folder]
+        name = self.break_proof_filename(os.path.splitext(os.path.basename(video_path))[0])
+        return os.path.join(folder, f"{name}_subbed{OUTPUT_MODES[mode][0]}"), mode
+
+    def calculate_eta(self, remaining_media, speed):
+        """Seconds until the queue is done: media seconds left to encode over the running encodes' combined speed"""
+        # Smoothed so jobs starting and finishing don't make it jump; gaps with no
+        # running encode (probing, stream copy, concat) keep the last measured speed
+        if speed > 0:
+            self.throughput = speed if not self.throughput else 0.8 * self.throughput + 0.2 * speed
+        if not self.throughput:
+            return 0.0
+        return max(0.0, remaining_media) / self.throughput
+
+    def build_force_style(self):
+        return build_force_style(self.subtitle_settings)
+
+    def get_ffmpeg_version(self):
+        capabilities = probe_ffmpeg()
+        return capabilities['version'] if capabilities else ""
+
+    def encode_settings(self):
+        """Everything besides the inputs that changes what an encode produces"""
+        return {
+            'preset': self.speed_preset,
+            'crf': self.subtitle_settings.get('crf_value', 23) if self.subtitle_settings.get('crf_enabled') else None,
+            'force_style': self.build_force_style(),
+            'smart_render': self.smart_render_enabled,
+            'ffmpeg': self.ffmpeg_version,
+        }
+
+    def cache_fingerprint(self, video_path, subtitle_path, output_mode):
+        if not self.output_cache:
+            return None
+        video_hash = self.file_hashes.get(video_path)
+        subtitle_hash = self.file_hashes.get(subtitle_path)
+        if not video_hash or not subtitle_hash:
+            return None
+        # The stream plan follows from the input, but changes whenever the rules for it do
+        settings = dict(self.encode_settings(), streams=self.stream_plans.get(video_path), output_mode=output_mode)
+        return OutputCache.fingerprint(video_hash, subtitle_hash, settings)
+
+    def prepare_subtitle(self, subtitle_path):
+        """Convert a subtitle to pre-styled ASS once, before any of its ranges is scheduled"""
+        try:
+            styled_path = prepare_styled_subtitle(self.input_path(subtitle_path), self.build_force_style())
+        except ValueError as e:
+            # libass can still read it; style through force_style as before
+            print(f"Using {os.path.basename(subtitle_path)} unconverted: {e}")
+            styled_path = None
+        with self.jobs_lock:
+            self.styled_subtitles[subtitle_path] = styled_path
+
+    def build_subtitle_filter(self, subtitle_path, offset=0.0):
+        styled_path = self.styled_subtitles.get(subtitle_path)
+        if styled_path:
+            return build_subtitle_filter(styled_path, offset=offset)
+        return build_subtitle_filter(self.input_path(subtitle_path), self.build_force_style(), offset)
+
+    def video_encode_args(self, threads):
+        args = ["-c:v", "libx264", "-preset", self.speed_preset, "-threads", str(threads)]
+
+        # Add CRF if enabled
+        if self.subtitle_settings.get('crf_enabled', False):
+            crf_value = self.subtitle_settings.get('crf_value', 23)
+            args += ["-crf", str(crf_value)]
+
+        return args
+
+    def video_map(self, video_path):
+        return ["-map", f"0:{self.stream_plans[video_path]['video']['index']}"]
+
+    def build_ffmpeg_cmd(self, video_path, subtitle_path, output_path, output_mode):
+        return [
+            "ffmpeg", "-y", "-i", self.input_path(video_path),
+            *self.video_map(video_path),
+            "-vf", self.build_subtitle_filter(subtitle_path),
+            *self.video_encode_args(self.threads_per_job),
+            *audio_args(self.stream_plans[video_path]),
+            *OUTPUT_MODES[output_mode][1],
+            output_path
+        ]
+
+    def build_segment_cmd(self, video_path, subtitle_path, start, end, segment_path, threads, pix_fmt=None):
+        cmd = [
+            "ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", self.input_path(video_path), "-t", f"{end - start:.6f}",
+            *self.video_map(video_path),
+            "-vf", self.build_subtitle_filter(subtitle_path, offset=start),
+            *self.video_encode_args(threads)
+        ]
+        # Re-encoded GOPs must match the stream-copied ones they sit between
+        if pix_fmt:
+            cmd += ["-pix_fmt", pix_fmt]
+        return cmd + ["-an", "-f", "mpegts", segment_path]
+
+    def build_copy_segment_cmd(self, video_path, start, end, segment_path):
+        return [
+            "ffmpeg", "-y", "-ss", f"{start:.6f}", "-i", self.input_path(video_path), "-t", f"{end - start:.6f}",
+            *self.video_map(video_path), "-c:v", "copy", "-avoid_negative_ts", "make_zero",
+            "-an", "-f", "mpegts", segment_path
+        ]
+
+    def build_concat_cmd(self, list_path, video_path, output_path, output_mode):
+        # Video comes from the encoded segments, audio straight from the source
+        return [
+            "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", self.input_path(video_path),
+            "-map", "0:v", "-c:v", "copy",
+            *audio_args(self.stream_plans[video_path], input_number=1),
+            *OUTPUT_MODES[output_mode][1],
+            output_path
+        ]
+
+    def run_ffmpeg(self, job, cmd, on_progress=None):
+        """Run one ffmpeg process for a job, reporting FFmpegProgress events; returns True on success"""
+        # Machine-readable progress on stdout, stderr reserved for errors
+        cmd = [cmd[0], "-hide_banner", "-loglevel", "error", "-nostats", "-progress", "pipe:1", *cmd[1:]]
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace'
+        )
+        with self.jobs_lock:
+            job['processes'].append(process)
+        # stop() or skip() may have run before the process was registered
+        if self.job_aborted(job):
+            self.terminate_job(job)
+
+        # Drain stderr on the side so a chatty failure can't block the pipe
+        errors = deque(maxlen=20)
+        stderr_reader = threading.Thread(target=errors.extend, args=(process.stderr,), daemon=True)
+        stderr_reader.start()
+
+        for event in read_ffmpeg_progress(process.stdout):
+            if self.job_aborted(job):
+                self.terminate_job(job)
+                break
+            if on_progress:
+                on_progress(event)
+
+        process.wait()
+        stderr_reader.join(timeout=5)
+
+        if process.returncode != 0 and not self.job_aborted(job):
+            job['error'] = "".join(errors).strip()
+        return process.returncode == 0 and not self.job_aborted(job)
+
+    def record_progress(self, job, slot, encoded_seconds, written_bytes, speed=0.0):
+        """Store the latest ffmpeg-reported state; publish_progress() picks it up on the next tick"""
+        job['encoded'][slot] = encoded_seconds
+        job['written'][slot] = written_bytes
+        job['speed'][slot] = speed
+        job['dirty'] = True
+
+    def record_encode_progress(self, job, slot, event):
+        """record_progress() for an encoding process; a finished one stops counting towards the speed"""
+        self.record_progress(job, slot, event.out_time, event.total_size, 0.0 if event.finished else event.speed)
+
+    def publish_progress(self, total_videos):
+        """Emit one batched snapshot of every job that moved since the last tick"""
+        with self.jobs_lock:
+            changed = [(job_id, job) for job_id, job in self.jobs.items() if job['dirty']]
+            for _, job in changed:
+                job['dirty'] = False
+                job['percent'] = min((sum(job['encoded']) / job['duration']) * 100, 99)
+            active = [job['video_name'] for job in self.jobs.values()]
+            running_progress = sum(job['percent'] for job in self.jobs.values())
+            running_media = sum(min(sum(job['encoded']), job['duration']) for job in self.jobs.values())
+            speed = sum(sum(job['speed']) for job in self.jobs.values())
+            done_media = self.finished_media + running_media
+            encode_media = self.remaining_encode_media()
+
+        if not changed:
+            return
+
+        snapshot = {
+            'jobs': {
+                job_id: {
+                    'percent': int(job['percent']),
+                    'video_name': job['video_name'],
+                    'output_size': sum(job['written']) / (1024 * 1024),
+                    'input_size': job['input_size'],
+                    'video_size': job['video_size'],
+                }
+                for job_id, job in changed
+            },
+            'active': active,
+            'overall': min(done_media / self.total_media * 100 if self.total_media else
+                           (self.processed_count + running_progress / 100) / total_videos * 100, 99),
+            'eta': self.calculate_eta(encode_media, speed),
+        }
+        self.on_progress(snapshot)
+
+    def remaining_encode_media(self):
+        """Media seconds still to be re-encoded; stream-copied ranges take next to no time. Needs jobs_lock"""
+        share = 1.0 - self.copied_media / self.planned_media if self.planned_media else 1.0
+        unstarted = self.total_media - self.finished_media - sum(job['duration'] for job in self.jobs.values())
+        remaining = max(0.0, unstarted) * share
+        for job in self.jobs.values():
+            left = job['duration'] - min(sum(job['encoded']), job['duration'])
+            if job['copies'] is None:
+                remaining += left * share
+            else:
+                remaining += max(0.0, left - sum(length - job['encoded'][slot]
+                                                 for slot, length in job['copies'].items()))
+        return remaining
+
+    def note_plan(self, job, ranges):
+        """Record which ranges of a job are stream-copied, indexed like job['encoded']"""
+        copies = {i: end - start for i, (start, end, mode) in enumerate(ranges) if mode == 'copy'}
+        with self.jobs_lock:
+            job['copies'] = copies
+            self.planned_media += job['duration']
+            self.copied_media += sum(copies.values())
+
+    def run(self):
+        """Encode the whole batch; returns (successful jobs, total jobs)"""
+        self.start_time = time.time()
+        total_videos = len(self.video_pairs)
+        # Knowing every duration and frame size up front lets the ETA weigh a film
+        # and an episode properly, and the scheduler start the biggest jobs first
+        self.media_info = self.probe_media(video_path for _, video_path, _ in self.video_pairs)
+        self.durations = {path: info['duration'] for path, info in self.media_info.items()}
+        self.total_media = sum(self.durations.get(video_path, 0.0) for _, video_path, _ in self.video_pairs)
+
+        # Inputs that could never produce a valid MP4 fail now, not hours into the batch
+        rejected = self.preflight(self.video_pairs)
+        for job_id, video_path, _ in self.video_pairs:
+            if video_path in rejected:
+                self.fail_job(job_id, video_path, rejected[video_path])
+        video_pairs = [pair for pair in self.video_pairs if pair[1] not in rejected]
+
+        if self.output_cache:
+            self.ffmpeg_version = self.get_ffmpeg_version()
+            # Every cache key is ready before the first encode competes for the disk
+            self.file_hashes = hash_files(
+                [path for _, video_path, subtitle_path in video_pairs for path in (video_path, subtitle_path)],
+                full=self.subtitle_settings.get('cache_full_hash', False)
+            )
+
+        video_pairs = self.schedule(video_pairs)
+        if self.disk_check_enabled:
+            self.size_history = OutputSizeHistory()
+        if self.prefetch_enabled:
+            self.start_prefetch(video_pairs)
+        if self.scratch_folder:
+            self.publisher = ThreadPoolExecutor(max_workers=1)
+        with ThreadPoolExecutor(max_workers=self.job_workers) as pool:
+            futures = [
+                pool.submit(self.process_video, job_id, video_path, subtitle_path)
+                for job_id, video_path, subtitle_path in video_pairs
+            ]
+
+            # One clock drives size, percent and ETA updates for all jobs
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=self.progress_interval)
+                self.publish_progress(total_videos)
+
+            success_count = sum(1 for future in futures if future.result())
+
+        if self.prefetcher:
+            self.prefetcher.close()
+        if self.publisher:
+            # Every encode is done; wait for the last outputs to reach their destination
+            self.publisher.shutdown(wait=True)
+            success_count -= self.failed_publishes
+
+        return success_count, total_videos
+
+    def start_prefetch(self, video_pairs):
+        """Start copying the batch's sources to local disk in the order the jobs will start"""
+        self.prefetcher = InputPrefetcher(self.scratch_folder or tempfile.gettempdir(), self.prefetch_budget,
+                                          room=self.prefetch_room if self.size_history else None)
+        # The first jobs start right away, so there is nothing to read ahead of them
+        try:
+            self.prefetcher.start(path for _, video_path, subtitle_path in video_pairs[self.job_workers:]
+                                  for path in (video_path, subtitle_path))
+        except OSError as e:
+            print(f"Input prefetch unavailable, reading sources in place: {e}")
+            self.prefetcher = None
+
+    def acquire_inputs(self, job, video_path, subtitle_path):
+        if self.prefetcher:
+            for path in (video_path, subtitle_path):
+                self.prefetcher.acquire(path)
+            job['inputs_acquired'] = True
+
+    def release_inputs(self, video_path, subtitle_path, acquired=False):
+        if self.prefetcher:
+            for path in (video_path, subtitle_path):
+                self.prefetcher.release(path, acquired)
+
+    def size_key(self):
+        settings = self.encode_settings()
+        return f"{settings['preset']}/crf{settings['crf'] or 'default'}{'/smart' if settings['smart_render'] else ''}"
+
+    def estimate_output_size(self, video_path):
+        """Expected bytes of a video's output: the source size scaled by past encodes with these settings"""
+        try:
+            source_size = os.path.getsize(video_path)
+        except OSError:
+            return 0
+        # With no history yet, assume the encode comes out no smaller than its source
+        ratio = self.size_history.ratio(self.size_key()) or 1.0
+        # Split encodes hold their parts and the joined file at the same time
+        copies = 2 if self.segment_enabled or self.smart_render_enabled else 1
+        return int(source_size * ratio * copies * SIZE_ESTIMATE_MARGIN)
+
+    def learn_output_size(self, video_path, output_path):
+        try:
+            ratio = os.path.getsize(output_path) / os.path.getsize(video_path)
+        except (OSError, ZeroDivisionError):
+            return
+        self.size_history.record(self.size_key(), ratio)
+
+    def space_needs(self, reservation):
+        """[(device, folder, bytes)] a job may still write: in its encode folder and, if elsewhere, its output folder"""
+        job = reservation['job']
+        estimate = reservation['estimate']
+        written = sum(job['written'])
+        progress = min(sum(job['encoded']) / job['duration'], 1.0) if job['duration'] else 0.0
+        if progress >= 0.1:
+            # Far enough in to project the final size from the real bitrate
+            estimate = int(written / progress * SIZE_ESTIMATE_MARGIN)
+        remaining = 0 if reservation['encoded'] else max(0, estimate - written)
+        needs = [(reservation['encode_device'], reservation['encode_folder'], remaining)]
+        if reservation['output_device'] != reservation['encode_device']:
+            # A staged output is copied over in full when it is published
+            needs.append((reservation['output_device'], reservation['output_folder'], max(estimate, written)))
+        return needs
+
+    def space_shortfall(self, reservation):
+        """(folder, bytes available) of the first volume the job doesn't fit on, or None if it fits"""
+        for device, folder, needed in self.space_needs(reservation):
+            try:
+                available = shutil.disk_usage(folder).free
+            except OSError:
+                continue
+            available -= sum(other_needed for other in self.reservations.values()
+                             for other_device, _, other_needed in self.space_needs(other) if other_device == device)
+            if self.prefetcher and self.prefetcher.device == device:
+                # A read-ahead copy in flight only checked for room when it began
+                available -= self.prefetcher.copying
+            if available - needed < self.min_free:
+                return folder, available
+        return None
+
+    def prefetch_room(self):
+        """Bytes read-ahead copies may add on their disk without cutting into encodes' reservations or min_free"""
+        try:
+            available = shutil.disk_usage(self.prefetcher.work_dir).free
+        except OSError:
+            return 0
+        with self.space_cond:
+            # Jobs holding for space come first too
+            claims = [*self.reservations.values(), *self.waiting_for_space.values()]
+            available -= sum(needed for reservation in claims
+                             for device, _, needed in self.space_needs(reservation)
+                             if device == self.prefetcher.device)
+        return available - self.min_free
+
+    def admit(self, job_id, job, video_path, encode_path, output_path):
+        """Wait until the job's output fits on disk next to the running jobs; False if it never will"""
+        if not self.size_history:
+            return True
+        output_folder = os.path.dirname(output_path)
+        encode_folder = self.scratch_folder if encode_path != output_path else output_folder
+        try:
+            encode_device = os.stat(encode_folder).st_dev
+            output_device = os.stat(output_folder).st_dev
+        except OSError:
+            return True
+        reservation = {
+            'job': job, 'estimate': self.estimate_output_size(video_path), 'encoded': False,
+            'encode_folder': encode_folder, 'encode_device': encode_device,
+            'output_folder': output_folder, 'output_device': output_device,
+        }
+        waiting = False
+        with self.space_cond:
+            try:
+                while not self.job_aborted(job):
+                    shortfall = self.space_shortfall(reservation)
+                    if not shortfall:
+                        self.reservations[job_id] = reservation
+                        return True
+                    folder, free = shortfall
+                    if not self.reservations and self.prefetcher and \
+                            self.prefetcher.device in (encode_device, output_device) and self.prefetcher.evict():
+                        # Read-ahead copies give way to an encode that can't start otherwise
+                        continue
+                    if not self.reservations:
+                        # Nothing running will give space back
+                        job['error'] = (f"Not enough disk space in {folder}: needs about "
+                                        f"{reservation['estimate'] / 1024 ** 3:.1f} GB plus "
+                                        f"{self.min_free / 1024 ** 3:g} GB kept free, "
+                                        f"{max(free, 0) / 1024 ** 3:.1f} GB available")
+                        return False
+                    if not waiting:
+                        waiting = True
+                        self.waiting_for_space[job_id] = reservation
+                        self.record_state(job_id, 'running', detail="Waiting for disk space")
+                        print(f"Holding back {job['video_name']} until {folder} has room for it")
+                    # Finished jobs notify; the timeout catches space freed outside the batch
+                    self.space_cond.wait(timeout=5)
+            finally:
+                self.waiting_for_space.pop(job_id, None)
+        return False
+
+    def release_space(self, job_id, encoded=False):
+        """Drop a job's reservation, or with encoded=True keep only what its publish will still copy"""
+        with self.space_cond:
+            if encoded and job_id in self.reservations:
+                self.reservations[job_id]['encoded'] = True
+            else:
+                self.reservations.pop(job_id, None)
+            self.space_cond.notify_all()
+
+    def fail_job(self, job_id, video_path, error):
+        """Fail a job that never started encoding"""
+        video_name = os.path.basename(video_path)
+        self.record_state(job_id, 'failed', detail=error)
+        self.on_error(video_name, error)
+        self.on_video_completed(job_id, video_name, False, "")
+        with self.jobs_lock:
+            self.processed_count += 1
+            self.finished_media += self.durations.get(video_path, 0.0)
+
+    def complete_job(self, job_id, video_name, output_path, fingerprint):
+        """Cache and report an output that is in its final place"""
+        if fingerprint:
+            try:
+                self.output_cache.store(fingerprint, output_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not cache output of {video_name}: {e}")
+        self.record_state(job_id, 'done')
+        self.on_video_completed(job_id, video_name, True, output_path)
+
+    def make_stage_dir(self, video_name):
+        """A private folder in the scratch folder for one encode, or None to write in place"""
+        if not self.scratch_folder:
+            return None
+        try:
+            os.makedirs(self.scratch_folder, exist_ok=True)
+            return tempfile.mkdtemp(prefix=".hardsubber_", dir=self.scratch_folder)
+        except OSError as e:
+            print(f"Scratch folder unavailable, writing {video_name} in place: {e}")
+            return None
+
+    def publish(self, job_id, video_name, staged_path, output_path, fingerprint):
+        """Move a finished output from the scratch folder into place; runs on the publisher thread"""
+        try:
+            publish_file(staged_path, output_path)
+        except OSError as e:
+            # Hours of encoding are worth keeping; the journal still points at the staged file
+            error = f"Could not move the output to {os.path.dirname(output_path)}: {e}. It is kept at {staged_path}"
+            self.record_state(job_id, 'failed', detail=error)
+            self.on_error(video_name, error)
+            self.on_video_completed(job_id, video_name, False, "")
+            with self.jobs_lock:
+                self.failed_publishes += 1
+            self.release_space(job_id)
+            return
+        shutil.rmtree(os.path.dirname(staged_path), ignore_errors=True)
+        self.release_space(job_id)
+        self.complete_job(job_id, video_name, output_path, fingerprint)
+
+    def process_video(self, job_id, video_path, subtitle_path):
+        """Encode one pair on a pool worker; returns True on success"""
+        if not self.is_running or self.cancelled:
+            return False
+
+        video_name = os.path.basename(video_path)
+        output_path, output_mode = self.output_target(video_path)
+
+        self.record_state(job_id, 'running', output_path)
+
+        fingerprint = self.cache_fingerprint(video_path, subtitle_path, output_mode)
+        if fingerprint:
+            try:
+                reused = self.output_cache.reuse(fingerprint, output_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Output cache unavailable for {video_name}: {e}")
+                reused = False
+            if reused:
+                self.release_inputs(video_path, subtitle_path)
+                self.record_state(job_id, 'done', detail="Reused cached output")
+                self.on_video_completed(job_id, video_name, True, output_path)
+                with self.jobs_lock:
+                    self.processed_count += 1
+                    self.finished_media += self.durations.get(video_path, 0.0)
+                return True
+
+        # ffmpeg -y writes in place, which would also change every hard link to a cached output
+        try:
+            if os.stat(output_path).st_nlink > 1:
+                os.remove(output_path)
+        except OSError:
+            pass
+
+        total_duration = self.durations[video_path]
+
+        video_size = self.get_file_size_mb(video_path)
+        subtitle_size = self.get_file_size_mb(subtitle_path)
+        input_total_size = video_size + subtitle_size
+
+        job = {
+            'video_name': video_name, 'processes': [], 'skip': False, 'percent': 0.0,
+            'duration': total_duration, 'input_size': input_total_size, 'video_size': video_size,
+            # Latest ffmpeg-reported seconds and bytes per range, sampled by the progress clock
+            'encoded': [0.0], 'written': [0], 'speed': [0.0], 'dirty': False,
+            # Slot -> seconds of the ranges smart render copies, None until the job is planned
+            'copies': None
+        }
+        with self.jobs_lock:
+            self.jobs[job_id] = job
+
+        stage_dir = self.make_stage_dir(video_name)
+        encode_path = output_path
+        if stage_dir:
+            encode_path = os.path.join(stage_dir, os.path.basename(output_path))
+            self.record_state(job_id, 'running', encode_path, detail="Encoding in the scratch folder")
+
+        success = False
+        admitted = publishing = False
+        try:
+            # Waits while the disks are short of room for this output
+            admitted = self.admit(job_id, job, video_path, encode_path, output_path)
+            if admitted:
+                # Waits if this job's sources are still being copied to local disk
+                self.acquire_inputs(job, video_path, subtitle_path)
+                self.prepare_subtitle(subtitle_path)
+                ranges = self.plan_job_ranges(job, video_path, subtitle_path, total_duration)
+                if self.claim_workers(job, bool(ranges) and self.split_job(total_duration)):
+                    try:
+                        if ranges:
+                            success = self.encode_ranges(job, video_path, subtitle_path, encode_path, output_mode,
+                                                         ranges)
+                        else:
+                            self.note_plan(job, ())
+                            cmd = self.build_ffmpeg_cmd(video_path, subtitle_path, encode_path, output_mode)
+                            success = self.run_ffmpeg(job, cmd,
+                                                      lambda event: self.record_encode_progress(job, 0, event))
+                    finally:
+                        self.release_workers()
+                if success and self.size_history:
+                    self.learn_output_size(video_path, encode_path)
+
+            if job['skip']:
+                self.record_state(job_id, 'skipped')
+                self.on_video_completed(job_id, video_name, False, "")
+            elif self.cancelled:
+                # Left for a resumed batch to discard and encode again
+                self.record_state(job_id, 'interrupted')
+            elif success and stage_dir:
+                # The worker moves on to the next encode while the publisher copies this one
+                self.publisher.submit(self.publish, job_id, video_name, encode_path, output_path, fingerprint)
+                stage_dir = None
+                publishing = True
+            elif success:
+                self.complete_job(job_id, video_name, output_path, fingerprint)
+            else:
+                error = job.get('error') or "FFmpeg processing failed"
+                if admitted and not stage_dir:
+                    # A truncated output would pass for a finished one
+                    try:
+                        os.remove(encode_path)
+                    except OSError:
+                        pass
+                self.record_state(job_id, 'failed', detail=error)
+                self.on_error(video_name, error)
+                self.on_video_completed(job_id, video_name, False, "")
+
+        except Exception as e:
+            success = False
+            self.record_state(job_id, 'failed', detail=str(e))
+            self.on_error(video_name, str(e))
+            self.on_video_completed(job_id, video_name, False, "")
+
+        if stage_dir:
+            shutil.rmtree(stage_dir, ignore_errors=True)
+        self.release_inputs(video_path, subtitle_path, job.get('inputs_acquired', False))
+        self.release_space(job_id, encoded=publishing)
+
+        with self.jobs_lock:
+            self.jobs.pop(job_id, None)
+            self.processed_count += 1
+            self.finished_media += self.durations.get(video_path, 0.0)
+
+        return success
+
+    def split_job(self, total_duration):
+        return self.segment_enabled and total_duration >= self.segment_min_duration
+
+    def claim_workers(self, job, split):
+        """Wait for room to encode: a split job needs the whole pool, others just no split job in the way"""
+        with self.pool_cond:
+            if split:
+                self.split_waiting += 1
+            try:
+                # A waiting split job holds back new jobs, so the running ones drain
+                while not self.job_aborted(job) and (
+                        self.split_running or (self.active_encodes if split else self.split_waiting)):
+                    self.pool_cond.wait()
+                if self.job_aborted(job):
+                    return False
+                self.active_encodes += 1
+                self.split_running = split
+                return True
+            finally:
+                if split:
+                    self.split_waiting -= 1
+
+    def release_workers(self):
+        with self.pool_cond:
+            self.active_encodes -= 1
+            self.split_running = False
+            self.pool_cond.notify_all()
+
+    def plan_job_ranges(self, job, video_path, subtitle_path, total_duration):
+        """Split plan for a job, or None to encode the whole file in one process"""
+        if self.smart_render_enabled:
+            # Copied GOPs keep the source codec, so only H.264 sources can be stitched
+            stream = self.stream_plans[video_path]['video']
+            if stream.get('codec_name') == 'h264':
+                keyframes = self.get_keyframes(video_path)
+                ranges = self.plan_smart_render(keyframes, self.get_subtitle_cues(subtitle_path), total_duration)
+                if any(mode == 'copy' for _, _, mode in ranges):
+                    job['pix_fmt'] = stream.get('pix_fmt')
+                    return ranges
+
+        if self.split_job(total_duration):
+            return self.plan_segments(self.get_keyframes(video_path), total_duration, self.max_workers)
+
+        return None
+
+    def encode_ranges(self, job, video_path, subtitle_path, output_path, output_mode, ranges):
+        """Encode or stream-copy every range in parallel, then concat them losslessly"""
+        # A split job owns every worker and core; smart render ranges of an
+        # unsplit job run one at a time within the job's share
+        if self.split_job(job['duration']):
+            range_workers, threads = self.max_workers, max(1, (os.cpu_count() or 1) // self.max_workers)
+        else:
+            range_workers, threads = 1, self.threads_per_job
+        pix_fmt = job.get('pix_fmt')
+        work_dir = tempfile.mkdtemp(prefix=".hardsubber_segments_", dir=os.path.dirname(output_path))
+
+        segment_paths = [os.path.join(work_dir, f"segment_{i:04d}.ts") for i in range(len(ranges))]
+        job['encoded'] = [0.0] * len(ranges)
+        job['written'] = [0] * len(ranges)
+        job['speed'] = [0.0] * len(ranges)
+        self.note_plan(job, ranges)
+
+        def process_range(i):
+            start, end, mode = ranges[i]
+            if mode == 'copy':
+                # Copied ranges count towards progress once they're written
+                def on_copy_progress(event):
+                    if event.finished:
+                        self.record_progress(job, i, end - start, event.total_size)
+
+                cmd = self.build_copy_segment_cmd(video_path, start, end, segment_paths[i])
+                return self.run_ffmpeg(job, cmd, on_copy_progress)
+            cmd = self.build_segment_cmd(video_path, subtitle_path, start, end, segment_paths[i], threads, pix_fmt)
+            return self.run_ffmpeg(job, cmd, lambda event: self.record_encode_progress(job, i, event))
+
+        try:
+            with ThreadPoolExecutor(max_workers=range_workers) as pool:
+                results = list(pool.map(process_range, range(len(ranges))))
+            if not all(results) or self.job_aborted(job):
+                return False
+
+            list_path = os.path.join(work_dir, "segments.txt")
+            with open(list_path, 'w', encoding='utf-8') as f:
+                for path in segment_paths:
+                    escaped = path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+
+            return self.run_ffmpeg(job, self.build_concat_cmd(list_path, video_path, output_path, output_mode))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# ---COMMAND LINE--- #
+def load_manifest(path):
+    """Read a JSON or TOML batch manifest; relative paths are resolved against its folder"""
+    with open(path, 'rb') as f:
+        if path.lower().endswith(".toml"):
+            manifest = tomllib.load(f)
+        else:
+            manifest = json.load(f)
+
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(value):
+        return os.path.normpath(os.path.join(base, os.path.expanduser(value)))
+
+    jobs = []
+    pinned = []
+    for number, entry in enumerate(manifest.get('jobs', []), 1):
+        if not isinstance(entry, dict) or not entry.get('video') or not entry.get('subtitle'):
+            raise ValueError(f"job {number} needs a 'video' and a 'subtitle'")
+        jobs.append((f"job-{number}", resolve(entry['video']), resolve(entry['subtitle'])))
+        if entry.get('pin'):
+            pinned.append(f"job-{number}")
+    if not jobs:
+        raise ValueError("the manifest lists no jobs")
+
+    output_folder = manifest.get('output_folder')
+    return {
+        'jobs': jobs,
+        'pinned': pinned,
+        'output_folder': resolve(output_folder) if output_folder else None,
+        'speed_preset': manifest.get('speed_preset', 'medium'),
+        'max_workers': int(manifest.get('max_workers', 1)),
+        'settings': manifest.get('settings', {}),
+        'cache': manifest.get('cache', True),
+        'journal': manifest.get('journal', True),
+    }
+
+
+def open_batch_journal(manifest, resume=False):
+    """Journal a manifest batch; returns (journal, jobs still to run).
+
+    With resume, jobs the previous journal lists as finished are kept out and
+    half-written outputs of interrupted ones are discarded.
+    """
+    jobs = manifest['jobs']
+    journal = JobJournal.for_folder(manifest['output_folder'] or os.path.dirname(jobs[0][1]))
+    previous = {}
+    if resume:
+        journal.discard_partial_outputs()
+        previous = {(job['video_path'], job['subtitle_path']): job['state'] for job in journal.jobs()}
+    states = []
+    for _, video_path, subtitle_path in jobs:
+        state = previous.get((video_path, subtitle_path))
+        states.append(state if state in JobJournal.FINAL_STATES else 'queued')
+    journal.start_batch(
+        [(*job, state) for job, state in zip(jobs, states)],
+        {key: manifest[key] for key in ('output_folder', 'speed_preset', 'max_workers', 'settings')}
+    )
+    return journal, [job for job, state in zip(jobs, states) if state == 'queued']
+
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hard-code subtitles for a batch described by a manifest.")
+    parser.add_argument("manifest", help="JSON or TOML file listing the jobs and encode settings")
+    parser.add_argument("-j", "--jobs", type=int, help="parallel jobs, overriding the manifest's max_workers")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip jobs the batch journal lists as done and redo interrupted ones")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only report finished and failed jobs")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, tomllib.TOMLDecodeError) as e:
+        print(f"Invalid manifest {args.manifest}: {e}", file=sys.stderr)
+        return 2
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        print("FFmpeg and FFprobe are required but not found in PATH.", file=sys.stderr)
+        return 2
+
+    jobs = manifest['jobs']
+    if args.jobs:
+        manifest['max_workers'] = args.jobs
+
+    journal = output_cache = None
+    try:
+        # ffmpeg won't create a missing output folder, and the journal lives in it
+        if manifest['output_folder']:
+            os.makedirs(manifest['output_folder'], exist_ok=True)
+        if manifest['journal']:
+            journal, jobs = open_batch_journal(manifest, args.resume)
+        if manifest['cache']:
+            output_cache = OutputCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Cannot prepare the batch: {e}", file=sys.stderr)
+        return 2
+    if len(jobs) < len(manifest['jobs']):
+        print(f"Resuming: {len(manifest['jobs']) - len(jobs)} of {len(manifest['jobs'])} jobs already finished")
+
+    last_percent = [-1]
+
+    def on_progress(snapshot):
+        percent = int(snapshot['overall'])
+        if args.quiet or percent == last_percent[0]:
+            return
+        last_percent[0] = percent
+        print(f"[{percent:3d}%] ETA {format_eta(snapshot['eta'])} | {', '.join(snapshot['active'])}", flush=True)
+
+    def on_video_completed(job_id, video_name, success, output_path):
+        if success:
+            print(f"Done: {video_name} -> {output_path}", flush=True)
+
+    def on_error(video_name, message):
+        print(f"Failed: {video_name}: {message}", file=sys.stderr, flush=True)
+
+    engine = EncodeEngine(
+        jobs, manifest['output_folder'], manifest['speed_preset'], manifest['settings'],
+        max_workers=manifest['max_workers'], journal=journal,
+        output_cache=output_cache, pinned=manifest['pinned'],
+        on_progress=on_progress, on_video_completed=on_video_completed, on_error=on_error
+    )
+
+    # The engine runs on its own thread so Ctrl+C can stop ffmpeg instead of waiting it out
+    result = []
+    runner = threading.Thread(target=lambda: result.append(engine.run()))
+    runner.start()
+    try:
+        while runner.is_alive():
+            runner.join(0.5)
+    except KeyboardInterrupt:
+        print("\nStopping, interrupted jobs stay in the journal for --resume", file=sys.stderr)
+        engine.stop()
+        runner.join()
+        if journal:
+            journal.close()
+        return 130
+
+    success_count, total_count = result[0] if result else (0, len(jobs))
+    print(f"Finished: {success_count}/{total_count} successful")
+    if journal:
+        if success_count == total_count:
+            journal.remove()
+        else:
+            journal.close()
+    return 0 if success_count == total_count else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
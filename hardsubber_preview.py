@@ -0,0 +1,486 @@
+# ╔════════════════════════════╗
+# ║  HardSubber Automator v4.3 ║
+# ║  Style Preview Widgets     ║
+# ║  by Nexus // MD-nexus      ║
+# ╚════════════════════════════╝
+#
+# Imported by AdvancedSettingsDialog when it opens.
+#
+# ffmpeg decodes one background frame per position, piped back as raw RGB.
+# Subtitle styling is drawn over that cached frame with Pillow, following
+# the force_style string the encoder passes to libass, so a style change
+# never starts ffmpeg.
+
+import io
+import json
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QSlider, QLabel
+from PyQt6.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap
+from hardsubber_engine import build_force_style, parse_force_style
+
+PREVIEW_WIDTH = 640
+PREVIEW_HEIGHT = 360
+PREVIEW_DEBOUNCE_MS = 120
+BACKGROUND_CACHE_SIZE = 8
+SAMPLE_TEXT = "Sample subtitle text to preview your styling changes"
+
+
+# ---SUBTITLE RASTERIZER--- #
+class SubtitleRasterizer:
+    """Draws subtitle text over a frame the way libass reads a force_style string.
+
+    ffmpeg gives SRT/VTT files a 384x288 script canvas with scaled borders,
+    so FontSize, Outline, Shadow and margins are script units scaled by
+    frame height / 288.
+
+    Font files are looked up (fc-match, font folders) on a helper thread, so
+    render() never waits on a subprocess or the disk: a family not found yet
+    draws in the bundled face, and on_font_ready() fires once it is loaded.
+    """
+    PLAY_RES_Y = 288
+    MARGIN = 10
+    LINE_SPACING = 1.15
+    # Style ffmpeg writes into the header of converted SRT/VTT files
+    DEFAULT_STYLE = {
+        'FontName': "Arial", 'FontSize': "16", 'PrimaryColour': "&H00FFFFFF",
+        'OutlineColour': "&H00000000", 'BackColour': "&H00000000",
+        'BorderStyle': "1", 'Outline': "1", 'Shadow': "0",
+    }
+
+    def __init__(self, on_font_ready=None):
+        self.on_font_ready = on_font_ready or (lambda: None)
+        self.fonts = {}
+        # Family name -> bytes of its font file, or None for the bundled face;
+        # names matching the same file share one copy
+        self.font_data = {}
+        self.file_data = {}
+        self.wanted_font = None
+        self.resolving = set()
+        self.lock = threading.Lock()
+        self.resolver = ThreadPoolExecutor(max_workers=1)
+
+    def font(self, name, size):
+        """Pillow font for a family name, built from memory; the bundled face until the file is found"""
+        self.wanted_font = name
+        if name not in self.font_data:
+            self.request_font(name)
+            name = None
+        key = (name, size)
+        if key not in self.fonts:
+            data = self.font_data.get(name)
+            self.fonts[key] = ImageFont.truetype(io.BytesIO(data), size) if data else ImageFont.load_default(size)
+        return self.fonts[key]
+
+    def request_font(self, name):
+        with self.lock:
+            if name in self.resolving:
+                return
+            self.resolving.add(name)
+        try:
+            self.resolver.submit(self.resolve_font, name)
+        except RuntimeError:
+            # Shut down with the preview
+            pass
+
+    def resolve_font(self, name):
+        """Read a family's font file; runs on the resolver thread"""
+        try:
+            # Typing a name queues every prefix of it; only the latest is worth a lookup
+            if name != self.wanted_font:
+                return
+            data = None
+            for candidate in self.font_files(name):
+                try:
+                    path = ImageFont.truetype(candidate, 10).path
+                    if path not in self.file_data:
+                        with open(path, 'rb') as f:
+                            self.file_data[path] = f.read()
+                    data = self.file_data[path]
+                    break
+                except OSError:
+                    continue
+            self.font_data[name] = data
+        finally:
+            with self.lock:
+                self.resolving.discard(name)
+        self.on_font_ready()
+
+    def close(self):
+        self.on_font_ready = lambda: None
+        self.resolver.shutdown(wait=False, cancel_futures=True)
+
+    def font_files(self, name):
+        # Pillow searches the system font folders for file names, not family names
+        compact = name.replace(" ", "")
+        candidates = [name, f"{name}.ttf", f"{compact}.ttf", f"{name.lower()}.ttf", f"{compact.lower()}.ttf"]
+        try:
+            result = subprocess.run(["fc-match", "-f", "%{file}", name], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, timeout=5)
+            if result.stdout:
+                candidates.append(result.stdout.strip())
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        return candidates + ["DejaVuSans.ttf"]
+
+    @staticmethod
+    def ass_colour(value):
+        """RGBA from an ASS &HAABBGGRR colour, whose alpha byte counts transparency"""
+        digits = value.strip().lstrip("&Hh").rstrip("&").rjust(8, "0")
+        try:
+            number = int(digits[-8:], 16)
+        except ValueError:
+            return (255, 255, 255, 255)
+        return (number & 0xFF, (number >> 8) & 0xFF, (number >> 16) & 0xFF, 255 - (number >> 24))
+
+    def number(self, style, field):
+        try:
+            return float(style[field])
+        except ValueError:
+            return float(self.DEFAULT_STYLE[field])
+
+    def wrap(self, text, font, max_width):
+        lines = []
+        for paragraph in text.split("\n"):
+            line = ""
+            for word in paragraph.split():
+                candidate = f"{line} {word}".strip()
+                if line and font.getlength(candidate) > max_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        return lines
+
+    def render(self, frame, text, force_style):
+        """Copy of the RGB frame with the text drawn bottom-centre in the given style"""
+        style = {**self.DEFAULT_STYLE, **parse_force_style(force_style)}
+        scale = frame.height / self.PLAY_RES_Y
+        font = self.font(style['FontName'], max(1, round(self.number(style, 'FontSize') * scale)))
+        outline = self.number(style, 'Outline') * scale
+        shadow = self.number(style, 'Shadow') * scale
+        primary = self.ass_colour(style['PrimaryColour'])
+        outline_colour = self.ass_colour(style['OutlineColour'])
+        back_colour = self.ass_colour(style['BackColour'])
+        border_style = int(self.number(style, 'BorderStyle'))
+
+        margin = self.MARGIN * scale
+        lines = self.wrap(text, font, frame.width - 2 * margin)
+        ascent, descent = font.getmetrics()
+        line_height = (ascent + descent) * self.LINE_SPACING
+        top = frame.height - margin - line_height * len(lines)
+
+        overlay = Image.new('RGBA', frame.size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(overlay)
+        placed = []
+        for i, line in enumerate(lines):
+            width = font.getlength(line)
+            placed.append(((frame.width - width) / 2, top + i * line_height, width))
+
+        pad = max(outline, 1)
+        if border_style == 4:
+            # libass: one opaque box behind the whole event
+            left = min(x for x, _, _ in placed) - pad
+            right = max(x + width for x, _, width in placed) + pad
+            draw.rectangle((left, top - pad, right, top + line_height * len(lines) + pad), fill=back_colour)
+
+        stroke = round(outline) if border_style not in (3, 4) else 0
+        for line, (x, y, width) in zip(lines, placed):
+            if border_style == 3:
+                # Opaque box per line, drawn in the outline colour with the shadow behind it
+                box = (x - pad, y - pad, x + width + pad, y + ascent + descent + pad)
+                if shadow:
+                    draw.rectangle(tuple(v + shadow for v in box), fill=back_colour)
+                draw.rectangle(box, fill=outline_colour)
+            elif shadow:
+                draw.text((x + shadow, y + shadow), line, font=font, fill=back_colour,
+                          stroke_width=stroke, stroke_fill=back_colour)
+            draw.text((x, y), line, font=font, fill=primary, stroke_width=stroke, stroke_fill=outline_colour)
+
+        return Image.alpha_composite(frame.convert('RGBA'), overlay).convert('RGB')
+
+
+# ---FRAME RENDERER THREAD CLASS--- #
+class FrameRenderer(QThread):
+    """Decodes one background frame per request; a newer request kills the decode in progress"""
+    frame_ready = pyqtSignal(int, object)
+    render_failed = pyqtSignal(int, str)
+    video_probed = pyqtSignal(str, float)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.process = None
+        self.running = True
+        self.videos = {}
+
+    def request(self, video_path, timestamp):
+        """Queue a frame, replacing any request not yet finished; returns its generation"""
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, video_path, timestamp)
+            self.kill_process()
+            self.condition.notify()
+            return self.generation
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.kill_process()
+            self.condition.notify()
+
+    def kill_process(self):
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+
+    def is_stale(self, generation):
+        with self.condition:
+            return generation != self.generation or not self.running
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    return
+                generation, video_path, timestamp = self.pending
+                self.pending = None
+
+            if video_path not in self.videos:
+                self.videos[video_path] = self.probe_video(video_path)
+                duration = self.videos[video_path][0]
+                if duration:
+                    self.video_probed.emit(video_path, duration)
+
+            image, error = self.decode_frame(generation, video_path, timestamp)
+            if self.is_stale(generation):
+                continue
+            if image is not None:
+                self.frame_ready.emit(generation, image)
+            else:
+                self.render_failed.emit(generation, error)
+
+    def probe_video(self, video_path):
+        """(duration, width, height) of the first video stream, with None for anything unknown"""
+        try:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "v:0",
+                 "-show_entries", "stream=width,height:format=duration", "-of", "json", video_path],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30
+            )
+            info = json.loads(result.stdout)
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            return None, None, None
+
+        streams = info.get('streams') or [{}]
+        try:
+            duration = float(info.get('format', {}).get('duration'))
+        except (TypeError, ValueError):
+            duration = None
+        return duration, streams[0].get('width'), streams[0].get('height')
+
+    def frame_size(self, video_path):
+        """Preview size that fits the box and keeps the source aspect ratio"""
+        _, width, height = self.videos.get(video_path, (None, None, None))
+        if not width or not height:
+            return PREVIEW_WIDTH, PREVIEW_HEIGHT
+        scale = min(PREVIEW_WIDTH / width, PREVIEW_HEIGHT / height)
+        return max(2, round(width * scale / 2) * 2), max(2, round(height * scale / 2) * 2)
+
+    def decode_frame(self, generation, video_path, timestamp):
+        """(PIL image, None) for the frame at timestamp, or (None, error message)"""
+        width, height = self.frame_size(video_path)
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-ss", f"{timestamp:.3f}", "-i", video_path,
+            "-frames:v", "1", "-an", "-sn", "-vf", f"scale={width}:{height}",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"
+        ]
+        try:
+            with self.condition:
+                if generation != self.generation or not self.running:
+                    return None, "superseded"
+                self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            data, errors = self.process.communicate(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.communicate()
+            return None, "Timed out decoding the preview frame"
+        except OSError as e:
+            return None, str(e)
+
+        frame_size = width * height * 3
+        if len(data) < frame_size:
+            return None, errors.decode('utf-8', 'replace').strip() or "No frame at this position"
+        return Image.frombytes('RGB', (width, height), data[:frame_size]), None
+
+
+# ---SUBTITLE PREVIEW WIDGET--- #
+class SubtitlePreviewWidget(QWidget):
+    font_ready = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.setStyleSheet("""
+          QWidget{ background:#2b2b2b; border:2px solid #555; border-radius:8px; }
+        """)
+        self.current_video_path = None
+        self.subtitle_settings = {}
+        self.position_ms = 30000
+        self.frame_image = None
+        self.latest_generation = 0
+        self.requested_key = None
+        # (video_path, position_ms) -> decoded background, most recent last
+        self.backgrounds = {}
+        # Called from the font thread; the signal brings the redraw to the GUI thread
+        self.rasterizer = SubtitleRasterizer(on_font_ready=self.font_ready.emit)
+        self.font_ready.connect(self.show_current)
+
+        # 1) frame view
+        self.frame_label = QLabel("Add videos to the table to preview subtitle styling")
+        self.frame_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.frame_label.setMinimumSize(PREVIEW_WIDTH, PREVIEW_HEIGHT)
+        self.frame_label.setStyleSheet("background-color: #000000; color: #aaaaaa;")
+
+        # 2) position controls
+        controls_layout = QHBoxLayout()
+
+        self.position_slider = QSlider(Qt.Orientation.Horizontal)
+        self.position_slider.setEnabled(False)
+        self.position_slider.valueChanged.connect(self.set_position)
+
+        self.time_label = QLabel("00:00 / 00:00")
+        self.time_label.setStyleSheet("color: white; font-size: 11px;")
+
+        controls_layout.addWidget(self.position_slider)
+        controls_layout.addWidget(self.time_label)
+
+        # 3) Main layout
+        main_layout = QVBoxLayout()
+        main_layout.addWidget(self.frame_label, 1)
+        main_layout.addLayout(controls_layout)
+
+        outer_layout = QVBoxLayout(self)
+        outer_layout.setContentsMargins(5, 5, 5, 5)
+        outer_layout.addLayout(main_layout)
+
+        # 4) background decoder, fed through a debounce timer
+        self.renderer = FrameRenderer(self)
+        self.renderer.frame_ready.connect(self.background_ready)
+        self.renderer.render_failed.connect(self.show_render_error)
+        self.renderer.video_probed.connect(self.video_probed)
+        self.renderer.start()
+
+        self.decode_timer = QTimer(self)
+        self.decode_timer.setSingleShot(True)
+        self.decode_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.decode_timer.timeout.connect(self.request_background)
+
+    def load_video(self, file_path):
+        """Preview frames from this video, starting 30 seconds in"""
+        self.current_video_path = file_path
+        self.position_ms = 30000
+        self.show_current()
+
+    def update_preview(self, subtitle_settings):
+        """Redraw the current frame with the settings AdvancedSettingsDialog would save"""
+        self.subtitle_settings = dict(subtitle_settings)
+        self.show_current()
+
+    def set_position(self, position):
+        self.position_ms = position
+        self.update_time_label()
+        self.show_current()
+
+    def show_current(self):
+        """Draw now if the background is cached, otherwise decode it after the debounce"""
+        if not self.current_video_path:
+            return
+        background = self.backgrounds.get((self.current_video_path, self.position_ms))
+        if background is not None:
+            self.decode_timer.stop()
+            self.compose(background)
+        else:
+            # Restarting the timer folds a burst of slider moves into one decode
+            self.decode_timer.start()
+
+    def request_background(self):
+        self.requested_key = (self.current_video_path, self.position_ms)
+        self.latest_generation = self.renderer.request(self.current_video_path, self.position_ms / 1000)
+
+    def background_ready(self, generation, image):
+        if generation != self.latest_generation:
+            return
+        self.backgrounds.pop(self.requested_key, None)
+        self.backgrounds[self.requested_key] = image
+        while len(self.backgrounds) > BACKGROUND_CACHE_SIZE:
+            self.backgrounds.pop(next(iter(self.backgrounds)))
+        if self.requested_key == (self.current_video_path, self.position_ms):
+            self.compose(image)
+
+    def compose(self, background):
+        frame = self.rasterizer.render(background, SAMPLE_TEXT, build_force_style(self.subtitle_settings))
+        image = QImage(frame.tobytes(), frame.width, frame.height, frame.width * 3, QImage.Format.Format_RGB888)
+        # QImage only wraps the buffer, so keep a copy that owns its pixels
+        self.frame_image = image.copy()
+        self.scale_frame()
+
+    def show_render_error(self, generation, message):
+        if generation == self.latest_generation and self.frame_image is None:
+            self.frame_label.setText(f"Preview unavailable: {message}")
+
+    def scale_frame(self):
+        if self.frame_image is not None:
+            self.frame_label.setPixmap(QPixmap.fromImage(self.frame_image).scaled(
+                self.frame_label.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            ))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.scale_frame()
+
+    def video_probed(self, video_path, duration):
+        if video_path != self.current_video_path:
+            return
+        duration_ms = int(duration * 1000)
+        self.position_slider.blockSignals(True)
+        self.position_slider.setRange(0, duration_ms)
+        if self.position_ms > duration_ms:
+            # Short clip: the default 30 s mark is past the end
+            self.position_ms = duration_ms // 2
+            self.show_current()
+        self.position_slider.setValue(self.position_ms)
+        self.position_slider.blockSignals(False)
+        self.position_slider.setEnabled(True)
+        self.update_time_label()
+
+    def update_time_label(self):
+        duration = self.position_slider.maximum()
+        if duration > 0:
+            self.time_label.setText(f"{self.format_time(self.position_ms)} / {self.format_time(duration)}")
+
+    def format_time(self, milliseconds):
+        """Format time in milliseconds to MM:SS"""
+        seconds = int(milliseconds / 1000)
+        minutes = seconds // 60
+        seconds = seconds % 60
+        return f"{minutes:02d}:{seconds:02d}"
+
+    def cleanup(self):
+        """Stop the background decoder and font lookups"""
+        self.decode_timer.stop()
+        self.rasterizer.close()
+        if self.renderer.isRunning():
+            self.renderer.stop()
+            self.renderer.wait()